@@ -0,0 +1,59 @@
+import time
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants, numeric
+from poloniexbot.utils import get_locked_balance
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class BalanceCache():
+    """
+        Balance of the currency we operate with: account balance plus amount locked in our own orders.
+
+        Our own actions only move money between the account and the orders, so the total stays the
+        same and there is no need to retrieve the account on every cycle. It is refreshed once in
+        `ttl` seconds, or after `invalidate` (e.g. when the ledger noticed a fill).
+
+        If the currency is spent by several reconcilers (e.g. BTC by the buy sides of BTC_ETH and
+        BTC_LTC), every one of them gets only its `shares` part of the free balance, plus what is
+        locked in its own orders, so that all together they never spend more than the account has.
+    """
+
+    def __init__(self, client, currency, ledger, ttl=constants.BALANCE_TTL, by_total=False, shares=1):
+        self.client = client
+        self.currency = currency
+        self.ledger = ledger
+        self.ttl = ttl
+        self.by_total = by_total
+        self.shares = shares
+
+        self.total = None
+        self.refreshed = None
+
+    def is_stale(self):
+        return self.refreshed is None or time.time() - self.refreshed >= self.ttl
+
+    def invalidate(self):
+        self.refreshed = None
+
+    async def refresh(self):
+        account = await self.client.accounts.retrieve(currency=self.currency)
+
+        logger.debug("--" * 20 + "Account" + "--" * 20)
+        logger.debug(account)
+
+        free = numeric.parse(account['amount'])
+        if self.shares > 1:
+            free = numeric.divide(free, numeric.parse(self.shares))
+
+        self.total = free + get_locked_balance(self.ledger, self.by_total)
+        self.refreshed = time.time()
+
+    async def get(self):
+        if self.is_stale():
+            await self.refresh()
+
+        return self.total
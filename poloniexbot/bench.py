@@ -0,0 +1,179 @@
+import argparse
+import json
+import platform
+import random
+import time
+from decimal import Decimal as D
+
+from poloniexbot import numeric
+from poloniexbot.orderbook import OrderBook
+from poloniexbot.utils import cut_off_orders, create_actions, convert, update_storage, synchronize_orders, \
+    get_locked_balance
+
+DEPTHS = [20, 200, 2000, 20000]
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+def measure(func, number, repeat=3):
+    """
+        Best of `repeat` runs, in seconds per call.
+    """
+    best = None
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - started) / number
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def generate_levels(depth, seed=0, start=D("0.01670000"), tick=D("0.00000001")):
+    """
+        Poloniex like asks: list of (rate, amount) strings, best price first.
+    """
+    generator = random.Random(seed)
+
+    levels = []
+    price = start
+    for _ in range(depth):
+        price += tick * generator.randint(1, 10)
+        amount = D(generator.randint(1, 10 ** 8)).scaleb(-8)
+        levels.append(('{:f}'.format(price), '{:f}'.format(amount)))
+
+    return levels
+
+
+def generate_updates(levels, number, seed=0, order_type='ask'):
+    """
+        Poloniex like push updates for the given levels: mostly amount modifications,
+        some removals and some new levels.
+    """
+    generator = random.Random(seed)
+
+    updates = []
+    for _ in range(number):
+        rate, amount = generator.choice(levels)
+        kind = generator.random()
+
+        if kind < 0.1:
+            amount = '0'
+        elif kind < 0.2:
+            rate = '{:f}'.format(D(rate) + D("0.000000005"))
+
+        updates.append({'rate': rate, 'amount': amount, 'type': order_type, 'pair': 'BTC_ETH'})
+
+    return updates
+
+
+def bench_arithmetic(depth, number):
+    """
+        Hot path of one push update and one reconciliation cycle with the current arithmetic.
+    """
+    levels = generate_levels(depth)
+    updates = generate_updates(levels, number)
+
+    book = OrderBook(depth=depth)
+    for rate, amount in levels:
+        update_storage(book, convert({'rate': rate, 'amount': amount, 'type': 'ask', 'pair': 'BTC_ETH'}))
+
+    orders = [convert(update) for update in updates]
+    iterator = iter(orders * 3)
+
+    poloniex_orders = book['sell'].orders()
+    absortium_orders = [order.copy(pk=index, status='pending', amount=order.amount + numeric.parse("0.1"))
+                        if index % 2 else order.copy(pk=index, status='pending')
+                        for index, order in enumerate(poloniex_orders)]
+    balance = numeric.parse(sum(D(amount) for _, amount in levels) / 2)
+
+    return {
+        'update_storage': measure(lambda: update_storage(book, next(iterator)), number),
+        'cut_off_orders': measure(lambda: cut_off_orders(balance, poloniex_orders), max(1, number // depth)),
+        'create_actions': measure(lambda: create_actions(absortium_orders, poloniex_orders), max(1, number // depth))
+    }
+
+
+def bench_fixed_point(depth=200, number=10000):
+    """
+        Compare Decimal and fixed point (see `poloniexbot.numeric`) representations.
+    """
+    previous = numeric.arithmetic
+    results = {}
+
+    try:
+        for arithmetic in [numeric.DecimalArithmetic(), numeric.FixedPointArithmetic()]:
+            numeric.set_arithmetic(arithmetic)
+            results[arithmetic.name] = bench_arithmetic(depth, number)
+    finally:
+        numeric.set_arithmetic(previous)
+
+    results['speedup'] = {name: results['decimal'][name] / results['fixed'][name] for name in results['decimal']}
+    return results
+
+
+def bench_depth(depth, number):
+    """
+        Hot functions of `poloniexbot.utils` on the book of the given depth, seconds per call.
+        Functions which walk the whole book are called `depth` times less.
+    """
+    asks = generate_levels(depth)
+    bids = [(rate, amount) for rate, amount in generate_levels(depth, seed=1, start=D("0.01660000"),
+                                                                tick=D("-0.00000001"))]
+    snapshot = {'asks': asks, 'bids': bids, 'seq': 1}
+
+    # Both sides of the book are updated, as they are live.
+    updates = [update for pair in zip(generate_updates(asks, number), generate_updates(bids, number, order_type='bid'))
+               for update in pair][:number]
+    orders = [convert(update) for update in updates]
+
+    book = OrderBook(depth=depth)
+    synchronize_orders(book, snapshot)
+
+    updates_iterator = iter(updates * 3)
+    orders_iterator = iter(orders * 3)
+
+    poloniex_orders = book['sell'].orders()
+    absortium_orders = [order.copy(pk=index, status='pending', amount=order.amount + numeric.parse("0.1"))
+                        if index % 2 else order.copy(pk=index, status='pending')
+                        for index, order in enumerate(poloniex_orders)]
+    balance = numeric.parse(sum(D(amount) for _, amount in asks) / 2)
+
+    walks = max(1, number // depth)
+
+    return {
+        'convert': measure(lambda: convert(next(updates_iterator)), number),
+        'update_storage': measure(lambda: update_storage(book, next(orders_iterator)), number),
+        'synchronize_orders': measure(lambda: synchronize_orders(OrderBook(depth=depth), snapshot), walks),
+        'create_actions': measure(lambda: create_actions(absortium_orders, poloniex_orders), walks),
+        'cut_off_orders': measure(lambda: cut_off_orders(balance, poloniex_orders), walks),
+        'get_locked_balance': measure(lambda: get_locked_balance(absortium_orders), walks)
+    }
+
+
+def bench_suite(depths=DEPTHS, number=10000):
+    """
+        `bench_depth` for every depth, with the environment the results were taken in, so that
+        results of the different runs (e.g. before and after the change) might be compared.
+    """
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'arithmetic': numeric.arithmetic.name,
+            'number': number
+        },
+        'results': {str(depth): bench_depth(depth, number) for depth in depths}
+    }
+
+
+if __name__ == '__main__':
+    # Runs without Django, e.g. `python -m poloniexbot.bench --depths 20 200`.
+    parser = argparse.ArgumentParser(description="Benchmark hot functions of the bot")
+    parser.add_argument('--depths', type=int, nargs='+', default=DEPTHS)
+    parser.add_argument('--number', type=int, default=10000)
+    arguments = parser.parse_args()
+
+    print(json.dumps(bench_suite(depths=arguments.depths, number=arguments.number), indent=4, sort_keys=True))
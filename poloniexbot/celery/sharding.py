@@ -0,0 +1,66 @@
+import zlib
+from uuid import uuid4
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+# Prolong the lock only if it is still ours.
+EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Release the lock only if it is still ours.
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LockLost(Exception):
+    pass
+
+
+def get_shard(pair, shards=constants.CELERY_SHARDS):
+    """
+        Shard of the pair - stable across the processes and restarts (unlike `hash`).
+    """
+    return zlib.crc32(pair.upper().encode()) % shards
+
+
+def get_shard_queue(pair, shards=constants.CELERY_SHARDS):
+    return "{}.{}".format(constants.CELERY_SHARD_QUEUE, get_shard(pair, shards))
+
+
+class PairLock():
+    """
+        Mutual exclusion of the pair mirroring across the workers, so that two workers never
+        drive the same pair. Lock expires in `ttl` seconds if it is not extended, so the pair
+        of the dead worker is picked up by another one.
+    """
+
+    def __init__(self, redis, pair, ttl=constants.PAIR_LOCK_TTL):
+        self.redis = redis
+        self.key = "poloniexbot:pair:{}".format(pair.upper())
+        self.token = uuid4().hex
+        self.ttl = int(ttl * 1000)
+
+    def acquire(self):
+        return bool(self.redis.set(self.key, self.token, nx=True, px=self.ttl))
+
+    def extend(self):
+        return bool(self.redis.eval(EXTEND_SCRIPT, 1, self.key, self.token, self.ttl))
+
+    def release(self):
+        return bool(self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.token))
+
+    def is_locked(self):
+        return bool(self.redis.exists(self.key))
@@ -0,0 +1,64 @@
+from __future__ import absolute_import
+
+__author__ = 'andrew.shvv@gmail.com'
+
+import redis
+from django.conf import settings
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.celery.app import app
+from poloniexbot.celery.base import get_base_class
+from poloniexbot.celery.sharding import PairLock, get_shard_queue
+
+logger = getPrettyLogger(__name__)
+
+
+def get_redis():
+    return redis.StrictRedis.from_url(settings.PAIR_LOCK_REDIS)
+
+
+@app.task(bind=True, base=get_base_class(), ignore_result=True)
+def mirror_pair(self, pair, all_pairs=None):
+    """
+        Long running task - mirrors the pair until the worker is stopped or the lock is lost.
+        Every mirrored pair occupies one worker process, so worker concurrency should be not
+        lower than the number of pairs in its shard.
+
+        Pairs run on the different workers, but spend the same account, so the balance of every
+        currency is shared between all the mirrored pairs (`all_pairs`) which spend it.
+    """
+    from poloniexbot.main import PoloniexApp
+
+    lock = PairLock(get_redis(), pair)
+    if not lock.acquire():
+        logger.debug("Pair {} is already mirrored by another worker".format(pair))
+        return
+
+    logger.info("Start mirroring {}".format(pair))
+
+    try:
+        poloniex_app = PoloniexApp(api_key=settings.POLONIEX_API_KEY, api_sec=settings.POLONIEX_API_SECRET,
+                                   pairs=[pair], all_pairs=all_pairs or constants.CURRENCY_PAIRS, lock=lock)
+        poloniex_app.run()
+    finally:
+        lock.release()
+
+
+@app.task(base=get_base_class(), ignore_result=True)
+def assign_pairs(pairs=None):
+    """
+        Periodic task - sends every pair which is not mirrored at the moment into the queue of its
+        shard (see `get_shard_queue`). Task expires with the next assignment, so that they do
+        not pile up in the queue if the workers of the shard are busy.
+    """
+    connection = get_redis()
+
+    pairs = pairs or constants.CURRENCY_PAIRS
+
+    for pair in pairs:
+        if PairLock(connection, pair).is_locked():
+            continue
+
+        mirror_pair.apply_async(args=[pair], kwargs={'all_pairs': pairs}, queue=get_shard_queue(pair),
+                                expires=constants.ASSIGN_PAIRS_INTERVAL)
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import math
+
+import aiohttp
+import requests
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class AbsortiumError(Exception):
+    def __init__(self, status, content):
+        super().__init__("Absortium responded with {}: {}".format(status, content))
+        self.status = status
+        self.content = content
+
+
+class OrdersResource():
+    path = "/api/orders/"
+
+    def __init__(self, client):
+        self.client = client
+
+        # Becomes False the first time the server tells us that it does not know about the bulk endpoint.
+        self.bulk_supported = True
+
+    async def list(self, **params):
+        return await self.client.request("GET", self.path, params=params)
+
+    async def list_all(self, limit=constants.MAX_IN_FLIGHT, **params):
+        """
+            Orders from all pages of the list (`list` gives only the first one). First page is
+            requested alone in order to know the count, the rest are requested concurrently,
+            keeping at most `limit` requests in flight.
+        """
+        first = await self.client.request("GET", self.path, params=dict(params, page=1), unwrap=False)
+
+        # List is not paginated.
+        if not isinstance(first, dict) or 'results' not in first:
+            return first
+
+        orders = list(first['results'])
+        if not first.get('next') or not orders:
+            return orders
+
+        semaphore = asyncio.Semaphore(limit)
+
+        async def get_page(page):
+            async with semaphore:
+                response = await self.client.request("GET", self.path, params=dict(params, page=page), unwrap=False)
+                return response['results']
+
+        pages = int(math.ceil(first['count'] / len(orders)))
+        for results in await asyncio.gather(*[get_page(page) for page in range(2, pages + 1)]):
+            orders.extend(results)
+
+        return orders
+
+    async def create(self, **data):
+        return await self.client.request("POST", self.path, data=data)
+
+    async def update(self, pk, **data):
+        return await self.client.request("PUT", "{}{}/".format(self.path, pk), data=data)
+
+    async def cancel(self, pk, **kwargs):
+        return await self.client.request("DELETE", "{}{}/".format(self.path, pk))
+
+    async def bulk(self, delete=(), update=(), create=()):
+        """
+            Send the whole action set as one request. Response has the same structure as
+            the request - list of per item results for every action, in the request order.
+        """
+        data = {
+            'delete': [{'pk': order['pk']} for order in delete],
+            'update': list(update),
+            'create': list(create)
+        }
+
+        return await self.client.request("POST", "{}bulk/".format(self.path), data=data)
+
+
+class AccountsResource():
+    path = "/api/accounts/"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def retrieve(self, currency):
+        return await self.client.request("GET", "{}{}/".format(self.path, currency))
+
+
+class AbsortiumClient():
+    """
+        Asyncio version of `absortium.client` with the same resource surface (`orders`, `accounts`).
+
+        All requests go through one `aiohttp` session with a pooled keep-alive connector,
+        so the event loop which receives Poloniex pushes is never blocked and the TCP
+        connection set up is paid once, not on every call.
+
+        Requests are signed by `auth` - the requests auth of the sync client (see
+        `get_absortium_client`), so that the signing scheme is not duplicated here and both
+        clients sign the requests the same way.
+    """
+
+    def __init__(self, base_api_uri, auth=None):
+        self.base_api_uri = base_api_uri.rstrip("/")
+        self.auth = auth
+
+        self.session = None
+
+        self.orders = OrdersResource(self)
+        self.accounts = AccountsResource(self)
+
+    def get_session(self):
+        # Session should be created inside the running event loop, that is why it is created lazily.
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=constants.ABSORTIUM_CONNECTIONS_LIMIT,
+                                             keepalive_timeout=constants.ABSORTIUM_KEEPALIVE_TIMEOUT)
+            self.session = aiohttp.ClientSession(connector=connector)
+
+        return self.session
+
+    def prepare(self, method, path, params=None, data=None):
+        """
+            URL, headers and body of the request, prepared and signed the same way the sync
+            client does it. Nothing is sent here.
+        """
+        request = requests.Request(method, self.base_api_uri + path, params=params,
+                                   data=json.dumps(data) if data is not None else None,
+                                   headers={"Content-Type": "application/json"}, auth=self.auth)
+        prepared = request.prepare()
+
+        return prepared.url, dict(prepared.headers), prepared.body
+
+    async def request(self, method, path, params=None, data=None, unwrap=True):
+        url, headers, body = self.prepare(method, path, params=params, data=data)
+
+        async with self.get_session().request(method, url, data=body, headers=headers) as response:
+            content = await response.text()
+
+            if response.status >= 400:
+                raise AbsortiumError(response.status, content)
+
+            if not content:
+                return None
+
+            content = json.loads(content)
+
+            # Paginated list responses are unwrapped, the same way the sync client does.
+            if unwrap and isinstance(content, dict) and 'results' in content:
+                return content['results']
+
+            return content
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+def get_absortium_client(api_key, api_secret, base_api_uri):
+    # Sync client is requests based, its session signs the requests. It is used only for signing.
+    from absortium.client import get_absortium_client as get_sync_client
+
+    sync_client = get_sync_client(api_key=api_key, api_secret=api_secret, base_api_uri=base_api_uri)
+    return AbsortiumClient(base_api_uri=base_api_uri, auth=sync_client.session.auth)
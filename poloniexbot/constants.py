@@ -14,5 +14,93 @@ PRICE_MIN_VALUE = Decimal(1 / 10 ** DECIMAL_PLACES)
 POLONIEX_ORDER_MODIFIED = "orderBookModify"
 POLONIEX_ORDER_REMOVED = "orderBookRemove"
 
+# Use integer number of ticks at `DECIMAL_PLACES` instead of `Decimal` for prices and
+# amounts internally (see `poloniexbot.numeric`).
+FIXED_POINT = False
+
+# Levels with amount lower than this are not mirrored.
+CUT_OFF_MIN_AMOUNT = Decimal("0.001")
+
 CURRENCY_PAIR = "BTC_ETH"
-COUNT = 20
\ No newline at end of file
+# Pairs which are mirrored by one process (see `PoloniexApp`).
+CURRENCY_PAIRS = [CURRENCY_PAIR]
+# How many push updates of the pair might be buffered while its book snapshot is fetched.
+FEED_BUFFER_LIMIT = 10000
+# Delay before the next snapshot, if the previous one was behind the push updates or failed.
+# Delay after the failed one is doubled every time, up to `FEED_RESYNC_MAX_DELAY` seconds.
+FEED_RESYNC_DELAY = 0.5
+FEED_RESYNC_MAX_DELAY = 30
+COUNT = 20
+
+# How many reconciliation cycles (of different pairs) might run at the same time. Pairs which
+# are waiting for the slot get it in turn, so that busy pairs do not starve the quiet ones.
+MAX_CONCURRENT_CYCLES = 4
+
+# Pairs are spread across the celery workers by shards: every pair is sent into the
+# "poloniexbot.shard.<N>" queue (see `poloniexbot.celery.sharding`).
+CELERY_SHARD_QUEUE = "poloniexbot.shard"
+CELERY_SHARDS = 4
+# How often the pairs which are not mirrored at the moment are sent to the workers.
+ASSIGN_PAIRS_INTERVAL = 60
+# Pair lock expires if the worker did not extend it for this time (e.g. worker is dead).
+PAIR_LOCK_TTL = 60
+PAIR_LOCK_EXTEND_INTERVAL = 20
+
+# Keep amounts of the book levels in numpy array and cut them off vectorized. Pays off only
+# for the deep books (hundreds of levels and more), requires numpy.
+VECTORIZED_BOOK = False
+
+ABSORTIUM_CONNECTIONS_LIMIT = 10
+ABSORTIUM_KEEPALIVE_TIMEOUT = 30
+
+# How many Absortium requests might be in flight at the same time during one reconciliation cycle.
+MAX_IN_FLIGHT = 10
+
+# Statuses of the orders which are still open. Only those are listed from Absortium, so that
+# we do not download the whole history of the account.
+OPEN_ORDER_STATUSES = ['init', 'pending']
+
+# Keep our open orders on startup instead of cancelling them, so that only the difference with
+# the book is sent on the first reconciliation cycle.
+ADOPT_ORDERS = False
+
+# Warm restart state (see `poloniexbot.persistence`): file to keep it in (None - do not keep) and
+# how often it is saved, in seconds.
+STATE_FILE = None
+STATE_SAVE_INTERVAL = 5
+
+# Recording of the push session (see `poloniexbot.replay`) is flushed at least once in this number
+# of seconds, so that gzipped recording is readable even if the process is killed.
+RECORD_FLUSH_INTERVAL = 1
+
+# Send all actions of the cycle as one bulk request, if Absortium supports it.
+BULK_ORDERS = True
+# Statuses with which Absortium responds when it does not have bulk endpoint.
+BULK_UNSUPPORTED_STATUSES = [404, 405, 501]
+
+# Reconciliation is run on book change: wait `RECONCILE_DEBOUNCE` seconds for the burst of updates
+# to settle, but do not run cycles more often than `RECONCILE_MIN_INTERVAL` seconds. If the book is
+# quiet, run the cycle anyway every `RECONCILE_MAX_STALENESS` seconds.
+RECONCILE_DEBOUNCE = 0.01
+RECONCILE_MIN_INTERVAL = 0.1
+RECONCILE_MAX_STALENESS = 30
+# Failed cycle (e.g. Absortium is down) is retried after the backoff, which is doubled on every
+# next failure, up to `RECONCILE_MAX_BACKOFF` seconds.
+RECONCILE_ERROR_BACKOFF = 0.5
+RECONCILE_MAX_BACKOFF = 30
+
+# How often the shadow of our Absortium orders is synced with the full list of orders.
+LEDGER_SYNC_INTERVAL = 60
+
+# Saved shadow of our orders might be used on startup instead of the list, if it was synced not
+# earlier than this number of seconds ago - it is not staler than the ledger of the running bot.
+STATE_MAX_AGE = LEDGER_SYNC_INTERVAL
+
+# How often the balance is retrieved from Absortium, if nothing unexpected happened with our orders.
+BALANCE_TTL = 30
+
+# Latency metrics (see `poloniexbot.metrics`) are served in Prometheus text format on
+# http://METRICS_HOST:METRICS_PORT/metrics (None - do not serve). Histogram buckets are in seconds.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None
+METRICS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
@@ -0,0 +1,188 @@
+from bisect import bisect_left, bisect_right
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class DepthIndex():
+    """
+        Cumulative depth of the book side - Fenwick tree over the weights of the levels (what the
+        levels cost us, see `OrderBookSide.get_weight`) in price order, so that "which levels fit
+        in the balance" (`fit`) and "depth down to the price" (`depth`) are O(log n) queries.
+
+        Every level occupies a slot. Removed level leaves its slot free, so that change of the
+        amount, removal of the level, a new level next to the free slot or after the last one are
+        O(log n) updates. Otherwise new level only marks the tree stale, and it is rebuilt (without
+        free slots, O(n)) by the next query - once per reconciliation cycle at most, not on every
+        push update. While the tree is stale, updates only change the weights.
+    """
+
+    def __init__(self):
+        # Price keys of the slots, in order. Keys of the free slots are kept, so that order is preserved.
+        self.keys = []
+        # Weights of the levels which are alive, by price key.
+        self.weights = {}
+
+        # Fenwick trees of the weights and of the number of levels with non zero weight.
+        self.sums = [0]
+        self.counts = [0]
+
+        # Tree does not match the weights, see `refresh`.
+        self.stale = False
+
+    def __len__(self):
+        return len(self.weights)
+
+    def add(self, tree, slot, delta):
+        index = slot + 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, tree, size):
+        """
+            Sum of the first `size` slots.
+        """
+        result = 0
+        while size > 0:
+            result += tree[size]
+            size -= size & -size
+        return result
+
+    def lower_bound(self, tree, value):
+        """
+            Returns number of the first slots with cumulative sum lower than `value`,
+            and the rest of the `value` after those slots.
+        """
+        position = 0
+        step = 1 << (len(tree) - 1).bit_length()
+
+        while step:
+            if position + step < len(tree) and tree[position + step] < value:
+                position += step
+                value -= tree[position]
+            step >>= 1
+
+        return position, value
+
+    def rebuild(self):
+        self.keys = sorted(self.weights.keys())
+        self.build()
+
+    def refresh(self):
+        if self.stale:
+            self.rebuild()
+
+    def load(self, keys, weights):
+        """
+            Replace the index with the given levels - `keys` should be sorted and unique.
+        """
+        self.keys = list(keys)
+        self.weights = dict(zip(self.keys, weights))
+        self.build()
+
+    def build(self):
+        self.stale = False
+        self.sums = [0] + [self.weights[key] for key in self.keys]
+        self.counts = [0] + [1 if self.weights[key] else 0 for key in self.keys]
+
+        for tree in [self.sums, self.counts]:
+            for index in range(1, len(tree)):
+                parent = index + (index & -index)
+                if parent < len(tree):
+                    tree[parent] += tree[index]
+
+    def get_slot(self, key):
+        """
+            Slot of the level with the given price key. If there is no such level, free slot
+            next to its position is taken. Returns None if there is no such slot.
+        """
+        slot = bisect_left(self.keys, key)
+
+        if slot < len(self.keys) and self.keys[slot] == key:
+            return slot
+
+        for candidate in [slot - 1, slot]:
+            if 0 <= candidate < len(self.keys) and self.keys[candidate] not in self.weights:
+                self.keys[candidate] = key
+                return candidate
+
+        return None
+
+    def set(self, key, weight):
+        if self.stale:
+            self.weights[key] = weight
+            return
+
+        old_weight = self.weights.get(key)
+
+        slot = self.get_slot(key)
+        if slot is None:
+            self.weights[key] = weight
+
+            if not self.keys or key > self.keys[-1]:
+                self.append(key, weight)
+            else:
+                self.stale = True
+            return
+
+        self.weights[key] = weight
+        old_weight = old_weight or 0
+
+        if weight != old_weight:
+            self.add(self.sums, slot, weight - old_weight)
+            self.add(self.counts, slot, (1 if weight else 0) - (1 if old_weight else 0))
+
+    def append(self, key, weight):
+        """
+            New last slot: its node covers the `lowbit` last slots, which are summed from the prefixes.
+        """
+        self.keys.append(key)
+        size = len(self.keys)
+
+        for tree, value in [(self.sums, weight), (self.counts, 1 if weight else 0)]:
+            tree.append(value + self.prefix(tree, size - 1) - self.prefix(tree, size - (size & -size)))
+
+    def remove(self, key):
+        weight = self.weights.pop(key, None)
+
+        if weight and not self.stale:
+            slot = bisect_left(self.keys, key)
+            self.add(self.sums, slot, -weight)
+            self.add(self.counts, slot, -1)
+
+    def clear(self):
+        self.weights = {}
+        self.rebuild()
+
+    def total(self):
+        self.refresh()
+        return self.prefix(self.sums, len(self.keys))
+
+    def depth(self, key):
+        """
+            Cumulative weight of the levels down to the given price key (inclusive).
+        """
+        self.refresh()
+        return self.prefix(self.sums, bisect_right(self.keys, key))
+
+    def fit(self, balance):
+        """
+            Returns (count, key, rest): number of the levels which fit in the balance entirely,
+            price key of the level which fits only partially (None if all levels fit) and the
+            weight of this level which fits.
+        """
+        self.refresh()
+
+        if balance <= 0:
+            # Nothing fits, but as `cut_off_orders` do, the first level is taken with the whole balance.
+            position, _ = self.lower_bound(self.counts, 1)
+            key = self.keys[position] if position < len(self.keys) else None
+            return 0, key, balance
+
+        position, rest = self.lower_bound(self.sums, balance)
+        count = self.prefix(self.counts, position)
+
+        if position == len(self.keys):
+            return count, None, None
+
+        return count, self.keys[position], rest
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants, metrics
+from poloniexbot.client import AbsortiumError
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+ACTIONS = ['delete', 'update', 'create']
+
+
+async def dispatch(client, actions, limit=constants.MAX_IN_FLIGHT, bulk=constants.BULK_ORDERS):
+    """
+        Send actions produced by `create_actions` to Absortium.
+
+        If `bulk` is set and the server supports it, the whole action set is sent as one
+        request, otherwise every action is sent separately (see `dispatch_concurrently`).
+
+        Orders are serialized here, at the API boundary. Returns the same structure as
+        `actions`, but with the response (or the raised exception) in place of every order.
+    """
+    # Nothing to do, e.g. heartbeat cycle or change under the cut off, should cost nothing.
+    if not any(actions[action] for action in ACTIONS):
+        return {action: [] for action in ACTIONS}
+
+    if bulk and client.orders.bulk_supported:
+        try:
+            return await dispatch_bulk(client, actions)
+        except AbsortiumError as e:
+            if e.status not in constants.BULK_UNSUPPORTED_STATUSES:
+                raise
+
+            logger.warning("Bulk orders endpoint is not supported, fall back to per order requests")
+            client.orders.bulk_supported = False
+
+    return await dispatch_concurrently(client, actions, limit=limit)
+
+
+async def dispatch_bulk(client, actions):
+    logger.debug({'bulk': actions})
+
+    started = time.time()
+    try:
+        response = await client.orders.bulk(**{action: [order.to_dict() for order in actions[action]]
+                                               for action in ACTIONS})
+        metrics.action_seconds.observe(time.time() - started, action='bulk', outcome='ok')
+    except Exception as e:
+        metrics.action_seconds.observe(time.time() - started, action='bulk', outcome='error')
+
+        if isinstance(e, AbsortiumError) and e.status in constants.BULK_UNSUPPORTED_STATUSES:
+            raise
+
+        # Transport errors (e.g. connection reset or timeout) fail every item, the same as
+        # they would fail the separate requests, so that the reconciler survives them.
+        logger.error({'bulk': actions, 'error': e})
+        return {action: [e] * len(actions[action]) for action in ACTIONS}
+
+    results = {}
+    for action in ACTIONS:
+        items = response.get(action, [])
+        results[action] = []
+
+        for index, order in enumerate(actions[action]):
+            result = items[index] if index < len(items) else None
+
+            if result is None or (isinstance(result, dict) and 'error' in result):
+                result = AbsortiumError(None, result)
+                logger.error({action: order, 'error': result})
+
+            results[action].append(result)
+
+    return results
+
+
+async def dispatch_concurrently(client, actions, limit=constants.MAX_IN_FLIGHT):
+    """
+        Send actions concurrently, keeping at most `limit` requests in flight. Cancels are
+        sent (and awaited) before updates and creates, so that balance locked by the
+        cancelled orders is released before we try to lock it again.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def send(action, method, order):
+        async with semaphore:
+            logger.debug({action: order})
+
+            started = time.time()
+            try:
+                if action == 'delete':
+                    result = await method(pk=order.pk)
+                else:
+                    result = await method(**order.to_dict())
+            except Exception:
+                metrics.action_seconds.observe(time.time() - started, action=action, outcome='error')
+                raise
+
+            metrics.action_seconds.observe(time.time() - started, action=action, outcome='ok')
+            return result
+
+    async def send_all(requests):
+        results = await asyncio.gather(*[send(*request) for request in requests], return_exceptions=True)
+
+        for (action, _, order), result in zip(requests, results):
+            if isinstance(result, Exception):
+                logger.error({action: order, 'error': result})
+
+        return results
+
+    deletes = [('delete', client.orders.cancel, order) for order in actions['delete']]
+    updates = [('update', client.orders.update, order) for order in actions['update']]
+    creates = [('create', client.orders.create, order) for order in actions['create']]
+
+    results = {'delete': await send_all(deletes)}
+
+    results['update'], results['create'] = [], []
+    for (action, _, _), result in zip(updates + creates, await send_all(updates + creates)):
+        results[action].append(result)
+
+    return results
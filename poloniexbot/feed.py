@@ -0,0 +1,139 @@
+import asyncio
+from collections import deque
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.utils import convert, update_storage, synchronize_orders
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class BookFeed():
+    """
+        Keeps the book of one pair in sync with Poloniex.
+
+        Push updates are applied in the sequence order (updates of one push message share the same
+        `seq`, every next message has it incremented by one). Stale updates are skipped, and if
+        the message was missed, the book of this pair (and only of it) is resynced from the fresh
+        snapshot in the background, while the other pairs keep running.
+
+        Until the book is bootstrapped from the snapshot, and while it is resynced, updates are
+        buffered. Once the snapshot is applied, only the buffered updates which are newer than
+        the snapshot are replayed, so that deltas are never applied out of order with it.
+    """
+
+    def __init__(self, pair, book, public_api, depth=constants.COUNT, recorder=None):
+        self.pair = pair
+        self.book = book
+        self.public_api = public_api
+        self.depth = depth
+        self.recorder = recorder
+
+        self.seq = None
+        self.resyncing = None
+        self.gaps = 0
+
+        # Book is not bootstrapped yet.
+        self.buffer = self.create_buffer()
+
+    @staticmethod
+    def create_buffer():
+        return deque(maxlen=constants.FEED_BUFFER_LIMIT)
+
+    def is_synced(self):
+        # Updates are buffered only until the book is (re)synced from the snapshot.
+        return self.buffer is None
+
+    def handle(self, update):
+        if self.buffer is not None:
+            self.buffer.append(update)
+            return
+
+        seq = update.get('seq')
+
+        if seq is not None and self.seq is not None:
+            if seq < self.seq:
+                logger.debug("Skip stale {} update: seq {} < {}".format(self.pair, seq, self.seq))
+                return
+
+            if seq > self.seq + 1:
+                logger.warning("Gap in {} updates: seq {} after {}, resync the book".format(self.pair, seq, self.seq))
+                self.gaps += 1
+                self.resync()
+                self.buffer.append(update)
+                return
+
+        if seq is not None:
+            self.seq = seq
+
+        self.apply(update)
+
+    def apply(self, update):
+        if update.get('type') in [constants.POLONIEX_ORDER_REMOVED, constants.POLONIEX_ORDER_MODIFIED]:
+            order = dict(update.get("data"), pair=self.pair)
+            update_storage(self.book, convert(order))
+
+    async def snapshot(self):
+        if self.buffer is None:
+            self.buffer = self.create_buffer()
+
+        # If it fails, updates are kept buffered - the book is not synced until the snapshot is applied.
+        orders = await self.public_api.returnOrderBook(currencyPair=self.pair, depth=self.depth)
+
+        if self.recorder is not None:
+            self.recorder.record_snapshot(self.pair, orders)
+
+        self.apply_snapshot(orders)
+
+    def apply_snapshot(self, orders):
+        """
+            Replace the book with the snapshot (in the `returnOrderBook` format) and replay
+            the buffered updates which are newer than the snapshot.
+        """
+        synchronize_orders(self.book, orders, pair=self.pair)
+        self.seq = orders.get('seq')
+
+        self.replay()
+
+    def replay(self):
+        buffer, self.buffer = self.buffer or [], None
+
+        for update in buffer:
+            seq = update.get('seq')
+
+            # Already in the snapshot.
+            if seq is not None and self.seq is not None and seq <= self.seq:
+                continue
+
+            # If there is a gap, the rest is buffered again until the next snapshot.
+            self.handle(update)
+
+    def resync(self):
+        if self.buffer is None:
+            self.buffer = self.create_buffer()
+
+        if self.resyncing is None:
+            self.resyncing = asyncio.ensure_future(self.resnapshot())
+
+    async def resnapshot(self):
+        delay = constants.FEED_RESYNC_DELAY
+
+        try:
+            while self.buffer is not None:
+                try:
+                    await self.snapshot()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Resync of {} failed, retry in {:.1f}s: {}".format(self.pair, delay, e))
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, constants.FEED_RESYNC_MAX_DELAY)
+                    continue
+
+                # There was a gap in the replayed updates, snapshot is probably behind the push api.
+                if self.buffer is not None:
+                    await asyncio.sleep(constants.FEED_RESYNC_DELAY)
+        finally:
+            self.resyncing = None
@@ -0,0 +1,95 @@
+import time
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import numeric
+from poloniexbot.order import Order
+from poloniexbot.utils import filter_orders
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class OrderLedger():
+    """
+        Shadow of our open Absortium orders, updated from the responses on the actions we send,
+        so that we do not have to list orders on every reconciliation cycle. Full list should
+        be synced from time to time (see `sync`) in order to catch the drift (e.g. fills).
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.by_price = {}
+        self.synced = None
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __iter__(self):
+        return iter(self.orders.values())
+
+    def add(self, order):
+        self.remove(order.pk)
+
+        if order.status in ['canceled', 'completed']:
+            return
+
+        self.orders[order.pk] = order
+        self.by_price[order.key] = order
+
+    def remove(self, pk):
+        order = self.orders.pop(pk, None)
+
+        if order is not None and self.by_price.get(order.key) is order:
+            del self.by_price[order.key]
+
+    def sync(self, orders):
+        """
+            Replace the shadow with the orders listed from Absortium (dicts, as they come from the API).
+        """
+        self.load([Order.from_dict(order) for order in orders])
+
+    def load(self, orders, synced=None):
+        """
+            Replace the shadow with the orders, which were listed at `synced` time (now by default).
+        """
+        self.orders = {}
+        self.by_price = {}
+
+        for order in filter_orders(orders):
+            self.add(order)
+
+        self.synced = synced if synced is not None else time.time()
+
+    def is_stale(self, interval):
+        return self.synced is None or time.time() - self.synced >= interval
+
+    def invalidate(self):
+        self.synced = None
+
+    def apply(self, actions, results):
+        """
+            Update the shadow from the results of `dispatch`. If some action failed, or the response
+            differs from what we have asked for (e.g. order is already partially filled), we do not
+            know for sure what is the state on the Absortium side, so the ledger should be synced.
+        """
+        for action in ['delete', 'update', 'create']:
+            for order, result in zip(actions[action], results[action]):
+                if isinstance(result, Exception):
+                    self.invalidate()
+
+                elif action == 'delete':
+                    self.remove(order.pk)
+
+                elif isinstance(result, dict) and 'pk' in result:
+                    status = result.get('status', order.status)
+
+                    if status in ['canceled', 'completed'] or \
+                            ('amount' in result and numeric.parse(result['amount']) != order.amount):
+                        self.invalidate()
+
+                    # Keep the values we have asked for, the response is needed for pk and status.
+                    self.add(order.copy(pk=result['pk'], status=status))
+
+                else:
+                    self.invalidate()
@@ -1,14 +1,24 @@
 import asyncio
-from decimal import Decimal as D
+import signal
+import threading
+import time
 
 from django.conf import settings
 
-from absortium.client import get_absortium_client
 from core.utils.logging import getPrettyLogger
 from poloniex.app import Application
 from poloniexbot import constants
-from poloniexbot.utils import update_storage, synchronize_orders, filter_orders, get_locked_balance, cut_off_orders, \
-    create_actions, convert
+from poloniexbot.celery.sharding import LockLost
+from poloniexbot.client import get_absortium_client
+from poloniexbot.dispatcher import dispatch_concurrently
+from poloniexbot.feed import BookFeed
+from poloniexbot.metrics import start_metrics_server
+from poloniexbot.orderbook import OrderBook
+from poloniexbot.order import Order
+from poloniexbot.persistence import StateStore
+from poloniexbot.reconciler import Reconciler
+from poloniexbot.replay import Recorder
+from poloniexbot.utils import filter_orders, split_duplicates
 
 __author__ = "andrew.shvv@gmail.com"
 
@@ -18,90 +28,256 @@ client = get_absortium_client(api_key=settings.ABSORTIUM_API_KEY,
                               api_secret=settings.ABSORTIUM_API_SECRET,
                               base_api_uri="http://docker.backend:3000")
 
-storage = {
-    'orders': {
-        'sell': [],
-        'buy': []
-    }
-}
-
 
 class PoloniexApp(Application):
-    def __init__(self, *args, **kwargs):
+    """
+        Mirrors the books of the given `pairs` (Poloniex notation, e.g. "BTC_ETH") in one event loop,
+        with one reconciler per side of the book. In X_Y pair asks are mirrored by selling Y and
+        bids by buying Y for X.
+    """
+
+    def __init__(self, *args, pairs=None, all_pairs=None, lock=None, adopt=constants.ADOPT_ORDERS, state_file=constants.STATE_FILE,
+                 record_file=None, client=client, metrics_port=constants.METRICS_PORT, **kwargs):
         super().__init__(*args, **kwargs)
+        self.client = client
+        self.recorder = Recorder(record_file) if record_file else None
+        self.lock = lock
+        self.adopt = adopt
+        self.adopted = []
+        # When the adopted orders were listed.
+        self.synced = None
+        self.store = StateStore(state_file) if state_file else None
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+
+        self.pairs = [pair.upper() for pair in (pairs or constants.CURRENCY_PAIRS)]
+        self.all_pairs = sorted(set(self.pairs) | {pair.upper() for pair in (all_pairs or [])})
+        self.books = {pair: OrderBook() for pair in self.pairs}
+        self.feeds = {pair: BookFeed(pair, self.books[pair], self.public_api, recorder=self.recorder)
+                      for pair in self.pairs}
+        self.reconcilers = {}
+        # Tasks which run while the app is running, see `stop`.
+        self.tasks = []
+
+        # How long every phase of the startup took, in seconds.
+        self.timings = {'list': 0, 'cancel': 0}
+
+    def run(self):
+        # SIGTERM (e.g. `docker stop`) is turned into SystemExit, so that the app is closed properly.
+        # Handler might be set only in the main thread.
+        handler = None
+        if threading.current_thread() is threading.main_thread():
+            handler = signal.signal(signal.SIGTERM, self.terminate)
+
+        try:
+            super().run()
+        finally:
+            if handler is not None:
+                signal.signal(signal.SIGTERM, handler)
+
+            # On SIGTERM the loop is interrupted before `main` is finished, recording should be kept anyway.
+            if self.recorder is not None:
+                self.recorder.close()
 
     @staticmethod
-    def updates_handler(**update):
-        if update.get('type') in [constants.POLONIEX_ORDER_REMOVED, constants.POLONIEX_ORDER_MODIFIED]:
-            order = update.get("data")
-            order["pair"] = update.get("currency_pair")
+    def terminate(signum, frame):
+        logger.info("Terminated by signal {}".format(signum))
+        raise SystemExit(0)
 
-            order = convert(order)
-            update_storage(storage, order)
+    async def close(self):
+        """
+            Release everything the app has opened, on the loop it was opened on.
+        """
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            await self.metrics_server.wait_closed()
+            self.metrics_server = None
 
-    async def main(self):
-        logger.debug("--" * 20 + "Cancel" + "--" * 20)
-        for order in [order for order in client.orders.list() if order['status'] not in ['canceled', 'completed']]:
-            logger.debug(client.orders.cancel(pk=order['pk']))
+        await self.client.close()
 
-        # 1. Turn on Poloniex orders update.
-        self.push_api.subscribe(topic=constants.CURRENCY_PAIR, handler=PoloniexApp.updates_handler)
+        if self.recorder is not None:
+            self.recorder.close()
 
-        # 2. Get Poloniex orders.
-        orders = await self.public_api.returnOrderBook(currencyPair=constants.CURRENCY_PAIR, depth=constants.COUNT)
+    @staticmethod
+    def get_currency(pair, order_type):
+        quote, base = pair.lower().split('_')
+        return base if order_type == 'sell' else quote
+
+    def updates_handler(self, **update):
+        if self.recorder is not None:
+            self.recorder.record_update(update)
 
-        # 3. Merge Poloniex orders.
-        synchronize_orders(storage, orders)
+        feed = self.feeds.get((update.get("currency_pair") or '').upper())
+        if feed is not None:
+            feed.handle(update)
+
+    async def keep_lock(self):
+        """
+            Lock of the pair (see `poloniexbot.celery.tasks.mirror_pair`) is extended while the app
+            is running, the app is stopped as soon as it is lost.
+        """
+        loop = asyncio.get_event_loop()
 
-        # Every 5 second:
         while True:
+            await asyncio.sleep(constants.PAIR_LOCK_EXTEND_INTERVAL)
+
+            # Redis client is blocking, so do not stall the reconcilers.
+            if not await loop.run_in_executor(None, self.lock.extend):
+                raise LockLost("Lock {} is lost".format(self.lock.key))
+
+    async def list_orders(self):
+        """
+            Our open orders of the mirrored pairs (orders of the other pairs might be mirrored by
+            the other workers). Only open orders are listed.
+        """
+        started = time.time()
+        orders = await self.client.orders.list_all(status=constants.OPEN_ORDER_STATUSES)
+        self.timings['list'] = time.time() - started
+
+        # In case the server does not filter by status.
+        pairs = [pair.lower() for pair in self.pairs]
+        return [order for order in filter_orders([Order.from_dict(order) for order in orders])
+                if (order.pair or '').lower() in pairs]
+
+    async def cancel_orders(self, orders):
+        """
+            Cancel orders concurrently, keeping at most `MAX_IN_FLIGHT` requests in flight.
+        """
+        started = time.time()
+        results = await dispatch_concurrently(self.client, {'delete': orders, 'update': [], 'create': []})
+        self.timings['cancel'] = time.time() - started
+
+        failed = len([result for result in results['delete'] if isinstance(result, Exception)])
+        logger.info("Cancelled {} orders ({} failed)".format(len(orders) - failed, failed))
+
+    async def adopt_orders(self):
+        """
+            Keep our open orders: reconcilers start with them in the ledger, so the first cycle
+            sends only the difference with the book (see `create_actions`) and the market is
+            not left empty while we restart. Only duplicates on one price level are cancelled.
+        """
+        self.adopted, duplicates = split_duplicates(await self.list_orders())
+        self.synced = time.time()
+        await self.cancel_orders(duplicates)
+
+        logger.info("Adopted {} orders".format(len(self.adopted)))
+
+    async def restore_orders(self, state):
+        """
+            Warm restart: our orders are taken from the saved shadow (see `StateStore`) without
+            listing them, as if they were listed when the shadow was synced, so reconcilers sync
+            their ledgers when they would do it if there was no restart. Nothing is cancelled and
+            recreated, except of the duplicates.
+        """
+        pairs = [pair.lower() for pair in self.pairs]
+        saved = [order for order in state['orders'] if (order.pair or '').lower() in pairs]
+
+        self.adopted, duplicates = split_duplicates(saved)
+        self.synced = state['synced']
+        await self.cancel_orders(duplicates)
+
+        logger.info("Restored {} orders".format(len(self.adopted)))
+
+    async def keep_state(self):
+        loop = asyncio.get_event_loop()
+
+        while True:
+            await asyncio.sleep(constants.STATE_SAVE_INTERVAL)
+
+            # State is taken at once, and written to the disk without blocking the loop.
+            state = self.store.dump(self.reconcilers)
+            try:
+                await loop.run_in_executor(None, self.store.save, state)
+            except Exception as e:
+                logger.error("State could not be saved: {}".format(e))
+
+    def get_adopted(self, pair, order_type):
+        return [order for order in self.adopted
+                if order.pair.lower() == pair.lower() and order.order_type == order_type]
+
+    async def main(self):
+        try:
+            await self.mirror()
+        finally:
+            await self.stop()
+            await self.close()
+
+    async def stop(self):
+        """
+            Cancel everything the app runs, so that nothing is left on the loop - e.g. when the
+            lock is lost, reconcilers of the pair should not keep running in the reused worker.
+        """
+        tasks = self.tasks + [feed.resyncing for feed in self.feeds.values() if feed.resyncing is not None]
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def mirror(self):
+        started = time.time()
 
-            order_type = 'sell'
-            from_currency = 'eth'
-            to_currency = 'btc'
+        if self.metrics_port is not None:
+            self.metrics_server = await start_metrics_server(port=self.metrics_port)
 
-            # 1. Get Absortium orders.
-            absortium_orders = client.orders.list(order_type=order_type)
+        if self.lock is not None:
+            self.tasks.append(asyncio.ensure_future(self.keep_lock()))
 
-            # 2. Leave only 'init' and 'pending' orders.
-            absortium_orders = filter_orders(absortium_orders)
+        # Warm restart keeps our orders, even if the state is too old to be used.
+        state = self.store.load() if self.store is not None else None
+        adopt = self.adopt or self.store is not None
 
-            # 3. Calculate how many amount we have to operate with. We should take into account money
-            # restriction (Not all order from Poloniex will be synced, because we do not have such amount of money)
-            account = client.accounts.retrieve(currency=from_currency)
-            accounts_balance = D(account['amount'])
-            amount = get_locked_balance(absortium_orders) + accounts_balance
+        if state is not None:
+            logger.debug("--" * 20 + "Restore" + "--" * 20)
+            await self.restore_orders(state)
+        elif adopt:
+            logger.debug("--" * 20 + "Adopt" + "--" * 20)
+            await self.adopt_orders()
+        else:
+            logger.debug("--" * 20 + "Cancel" + "--" * 20)
+            await self.cancel_orders(await self.list_orders())
 
-            logger.debug("--" * 20 + "Account" + "--" * 20)
-            logger.debug(account)
+        # Reconcilers of all pairs take turns in running their cycles.
+        scheduler = asyncio.Semaphore(constants.MAX_CONCURRENT_CYCLES)
 
-            # 4. Get Poloniex orders and cut off redundant.
-            poloniex_orders = storage['orders'][order_type]
+        # Free balance of the currency is split between the reconcilers which spend it, in this
+        # process or in the other ones.
+        currencies = [self.get_currency(pair, order_type) for pair in self.all_pairs for order_type in ['sell', 'buy']]
 
-            logger.debug("--" * 20 + "Before cut" + "--" * 20)
-            logger.debug(poloniex_orders)
+        snapshot_started = time.time()
+        snapshots = []
+        for pair in self.pairs:
+            # 1. Turn on Poloniex orders update.
+            self.push_api.subscribe(topic=pair, handler=self.updates_handler)
 
-            poloniex_orders = cut_off_orders(amount, poloniex_orders)
+            # 2. Get Poloniex orders and merge them.
+            snapshots.append(self.feeds[pair].snapshot())
 
-            logger.debug("--" * 20 + "After cut" + "--" * 20)
-            logger.debug(poloniex_orders)
+        # Snapshots of all pairs are requested at once, so that startup does not take a round trip per pair.
+        await asyncio.gather(*snapshots)
 
-            # 5. What should have to do to sync the orders?
-            actions = create_actions(absortium_orders, poloniex_orders)
+        # 3. Sync Absortium orders every time the side of the book is changed.
+        for pair in self.pairs:
+            for order_type in ['sell', 'buy']:
+                from_currency = self.get_currency(pair, order_type)
+                reconciler = Reconciler(self.client, self.books[pair][order_type], order_type=order_type,
+                                        from_currency=from_currency, pair=pair,
+                                        scheduler=scheduler, shares=currencies.count(from_currency),
+                                        ready=self.feeds[pair].is_synced)
 
-            logger.debug("--" * 20 + "Actions" + "--" * 20)
-            for order in actions['delete']:
-                logger.debug({'delete': order})
-                client.orders.cancel(**order)
+                if adopt:
+                    # Orders are just listed (or restored), there is no need to list them on the first cycle.
+                    reconciler.ledger.load(self.get_adopted(pair, order_type), synced=self.synced)
 
-            for order in actions['update']:
-                del order['total']
+                self.reconcilers[(pair, order_type)] = reconciler
 
-                logger.debug({'update': order})
-                client.orders.update(**order)
+        self.timings['snapshot'] = time.time() - snapshot_started
+        self.timings['total'] = time.time() - started
+        logger.info("Startup took {total:.3f}s (list: {list:.3f}s, cancel: {cancel:.3f}s, "
+                    "snapshot: {snapshot:.3f}s)".format(**self.timings))
 
-            for order in actions['create']:
-                logger.debug({'create': order})
-                client.orders.create(**order)
+        if self.store is not None:
+            self.tasks.append(asyncio.ensure_future(self.keep_state()))
 
-            await asyncio.sleep(0.5)
+        # Every side is reconciled in its own task, so that sides do not wait for each other.
+        self.tasks.extend([asyncio.ensure_future(reconciler.run()) for reconciler in self.reconcilers.values()])
+        await asyncio.gather(*self.tasks)
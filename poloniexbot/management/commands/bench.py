@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from poloniexbot.bench import DEPTHS, bench_fixed_point, bench_suite
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot functions of the bot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suite', choices=['hot', 'arithmetic'], default='hot',
+                            help="Hot functions at the different depths, or Decimal vs fixed point")
+        parser.add_argument('--depths', type=int, nargs='+', default=DEPTHS)
+        parser.add_argument('--depth', type=int, default=200, help="Depth for the arithmetic suite")
+        parser.add_argument('--number', type=int, default=10000)
+        parser.add_argument('--output', default=None, help="File to write the results into")
+
+    def handle(self, *args, **options):
+        if options['suite'] == 'hot':
+            results = bench_suite(depths=options['depths'], number=options['number'])
+        else:
+            results = bench_fixed_point(depth=options['depth'], number=options['number'])
+
+        output = json.dumps(results, indent=4, sort_keys=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+
+        self.stdout.write(output)
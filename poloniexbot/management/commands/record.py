@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from poloniexbot import constants
+from poloniexbot.main import PoloniexApp
+from poloniexbot.replay import StubClient
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class Command(BaseCommand):
+    help = 'Record Poloniex push updates and book snapshots, in order to replay them later'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to record into (gzipped if it ends with .gz)")
+        parser.add_argument('--pairs', nargs='+', default=constants.CURRENCY_PAIRS,
+                            help="Currency pairs to record, e.g. BTC_ETH BTC_LTC")
+        parser.add_argument('--mirror', action='store_true',
+                            help="Mirror the orders to Absortium while recording, instead of the stub")
+
+    def handle(self, *args, **options):
+        kwargs = {} if options['mirror'] else {'client': StubClient()}
+
+        app = PoloniexApp(api_key=settings.POLONIEX_API_KEY, api_sec=settings.POLONIEX_API_SECRET,
+                          pairs=options['pairs'], record_file=options['output'], **kwargs)
+        app.run()
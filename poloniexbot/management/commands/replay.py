@@ -0,0 +1,28 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand
+
+from poloniexbot.replay import Replayer, StubClient
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class Command(BaseCommand):
+    help = 'Replay the recorded Poloniex session against the Absortium stub and report the throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Recorded file (see the `record` command)")
+        parser.add_argument('--pairs', nargs='+', default=None,
+                            help="Replay only these pairs")
+        parser.add_argument('--speed', type=float, default=None,
+                            help="Keep the recorded timing, N times faster (as fast as possible by default)")
+        parser.add_argument('--latency', type=float, default=0,
+                            help="Latency of every stub request, in seconds")
+
+    def handle(self, *args, **options):
+        replayer = Replayer(options['input'], pairs=options['pairs'], speed=options['speed'],
+                            client=StubClient(latency=options['latency']))
+
+        results = asyncio.get_event_loop().run_until_complete(replayer.run())
+        self.stdout.write(json.dumps(results, indent=4, sort_keys=True))
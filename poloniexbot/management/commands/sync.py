@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from poloniexbot import constants
 from poloniexbot.main import PoloniexApp
 
 __author__ = 'andrew.shvv@gmail.com'
@@ -9,6 +10,18 @@ __author__ = 'andrew.shvv@gmail.com'
 class Command(BaseCommand):
     help = 'Sync Poloniex orders and create Absortium orders'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', nargs='+', default=constants.CURRENCY_PAIRS,
+                            help="Currency pairs to mirror, e.g. BTC_ETH BTC_LTC")
+        parser.add_argument('--adopt', action='store_true', default=constants.ADOPT_ORDERS,
+                            help="Keep our open orders on startup instead of cancelling them")
+        parser.add_argument('--state', default=constants.STATE_FILE,
+                            help="File to keep the warm restart state in")
+        parser.add_argument('--metrics-port', type=int, default=constants.METRICS_PORT,
+                            help="Local port to serve the latency metrics on")
+
     def handle(self, *args, **options):
-        app = PoloniexApp(api_key=settings.POLONIEX_API_KEY, api_sec=settings.POLONIEX_API_SECRET)
+        app = PoloniexApp(api_key=settings.POLONIEX_API_KEY, api_sec=settings.POLONIEX_API_SECRET,
+                          pairs=options['pairs'], adopt=options['adopt'],
+                          state_file=options['state'], metrics_port=options['metrics_port'])
         app.run()
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, escape(value)) for name, value in pairs) + "}"
+
+
+def format_bound(bound):
+    return "+Inf" if bound == float('inf') else repr(float(bound))
+
+
+class Histogram():
+    """
+        Latency histogram in the Prometheus manner: count of the observations in every bucket
+        (observation goes into the first bucket whose upper bound is not less than it), their
+        sum and count, separately for every combination of the `labels` values.
+    """
+
+    def __init__(self, name, help, labels=(), buckets=constants.METRICS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = sorted(buckets) + [float('inf')]
+
+        # Labels values -> [counts of the buckets, sum]
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        if key not in self.series:
+            self.series[key] = [[0] * len(self.buckets), 0.0]
+
+        counts, _ = series = self.series[key]
+        counts[bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        # Time is observed even if the block failed, slow failures are the interesting ones.
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - started, **labels)
+
+    def get_count(self, **labels):
+        series = self.series.get(tuple(str(labels[name]) for name in self.labels))
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = ["# HELP {} {}".format(self.name, self.help), "# TYPE {} histogram".format(self.name)]
+
+        for key, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(
+                    self.name, format_labels(self.labels, key, ('le', format_bound(bound))), cumulative))
+
+            lines.append("{}_sum{} {!r}".format(self.name, format_labels(self.labels, key), total))
+            lines.append("{}_count{} {}".format(self.name, format_labels(self.labels, key), cumulative))
+
+        return "\n".join(lines) + "\n"
+
+
+class Registry():
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "".join(metric.render() for metric in self.metrics)
+
+
+registry = Registry()
+
+# Whole reconciliation cycle, and its stages: 'orders_list' (ledger sync), 'account_retrieve'
+# (balance refresh), 'cut_off', 'diff' and 'dispatch' (all actions of the cycle).
+cycle_seconds = registry.histogram("poloniexbot_cycle_seconds", "Reconciliation cycle duration",
+                                   labels=['reconciler'])
+stage_seconds = registry.histogram("poloniexbot_cycle_stage_seconds", "Reconciliation cycle stage duration",
+                                   labels=['reconciler', 'stage'])
+
+# Every Absortium request sent by the dispatcher: 'delete', 'update', 'create' or 'bulk'.
+action_seconds = registry.histogram("poloniexbot_action_seconds", "Absortium order request duration",
+                                    labels=['action', 'outcome'])
+
+
+async def serve_metrics(reader, writer, registry=registry):
+    try:
+        request = await reader.readline()
+
+        # Headers are not needed.
+        while (await reader.readline()).strip():
+            pass
+
+        parts = request.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] in ['/', '/metrics']:
+            status, body = "200 OK", registry.render()
+        else:
+            status, body = "404 Not Found", "Not found\n"
+
+        body = body.encode('utf-8')
+        writer.write("HTTP/1.0 {}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     "Content-Length: {}\r\nConnection: close\r\n\r\n".format(status, len(body)).encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+    except Exception as e:
+        logger.debug("Metrics request failed: {}".format(e))
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host=constants.METRICS_HOST, port=constants.METRICS_PORT, registry=registry):
+    """
+        Serve the metrics in Prometheus text format. Server is minimal (one request per connection),
+        it is meant to be scraped locally, not to be exposed.
+    """
+    server = await asyncio.start_server(lambda reader, writer: serve_metrics(reader, writer, registry=registry),
+                                        host, port)
+    logger.info("Metrics are served on http://{}:{}/metrics".format(host, port))
+    return server
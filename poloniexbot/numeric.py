@@ -0,0 +1,94 @@
+from decimal import Decimal as D, ROUND_DOWN, ROUND_UP
+
+from poloniexbot import constants
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class DecimalArithmetic():
+    """
+        Prices and amounts are `decimal.Decimal`.
+    """
+    name = "decimal"
+
+    def __init__(self):
+        self.quantum = D(1).scaleb(-constants.DECIMAL_PLACES)
+
+    def parse(self, value):
+        return D(str(value))
+
+    def from_decimal(self, value):
+        return value
+
+    def to_decimal(self, value):
+        return value
+
+    def price_key(self, value):
+        return int(value.scaleb(constants.DECIMAL_PLACES).to_integral_value())
+
+    def multiply(self, value, other):
+        return (value * other).quantize(self.quantum, rounding=ROUND_UP)
+
+    def divide(self, value, other):
+        return (value / other).quantize(self.quantum, rounding=ROUND_DOWN)
+
+
+class FixedPointArithmetic():
+    """
+        Prices and amounts are integer number of ticks at `constants.DECIMAL_PLACES`, which is the
+        precision of Absortium, so integer compare/add/sub is exact and much cheaper than Decimal.
+        Values are converted only at the edges: when they come from Poloniex or Absortium and
+        when they are serialized back.
+    """
+    name = "fixed"
+
+    def __init__(self):
+        self.limit = 10 ** constants.MAX_DIGITS
+        self.scale = 10 ** constants.DECIMAL_PLACES
+
+    def parse(self, value):
+        return self.from_decimal(D(str(value)))
+
+    def from_decimal(self, value):
+        ticks = int(value.scaleb(constants.DECIMAL_PLACES).to_integral_value())
+
+        if abs(ticks) >= self.limit:
+            raise ValueError("Value {} does not fit into {} digits".format(value, constants.MAX_DIGITS))
+
+        return ticks
+
+    def to_decimal(self, value):
+        return D(value).scaleb(-constants.DECIMAL_PLACES)
+
+    def price_key(self, value):
+        return value
+
+    def multiply(self, value, other):
+        return -(-value * other // self.scale)
+
+    def divide(self, value, other):
+        return value * self.scale // other
+
+
+def set_arithmetic(new_arithmetic):
+    """
+        Switch the representation of prices and amounts. Orders created before the switch
+        are not converted, so it should be done before any order is created.
+    """
+    global arithmetic, parse, from_decimal, to_decimal, price_key, multiply, divide, cut_off_min_amount
+
+    arithmetic = new_arithmetic
+    parse = arithmetic.parse
+    from_decimal = arithmetic.from_decimal
+    to_decimal = arithmetic.to_decimal
+    price_key = arithmetic.price_key
+
+    # Products (e.g. cost of the order) are rounded up and quotients (e.g. amount we
+    # can afford) are rounded down to `DECIMAL_PLACES`, so that we never overspend.
+    multiply = arithmetic.multiply
+    divide = arithmetic.divide
+
+    cut_off_min_amount = arithmetic.from_decimal(constants.CUT_OFF_MIN_AMOUNT)
+
+
+set_arithmetic(FixedPointArithmetic() if constants.FIXED_POINT else DecimalArithmetic())
@@ -0,0 +1,83 @@
+from poloniexbot import numeric
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+def get_price_key(price):
+    """
+        Canonical price key - integer number of price ticks at `constants.DECIMAL_PLACES`, so that
+        '0.0167', '0.01670000' and str(float) of the same price are the same level.
+    """
+    return numeric.price_key(price)
+
+
+def serialize_decimal(value):
+    # Fixed point notation, str() might give us '1E-8' which Absortium would not accept.
+    return '{:f}'.format(numeric.to_decimal(value))
+
+
+class Order():
+    """
+        Order (or the level of the order book) with price and amount parsed once (see
+        `poloniexbot.numeric`), when it comes to us from Poloniex (`convert`) or from
+        Absortium (`from_dict`). Orders are turned back
+        into dicts of strings only at the Absortium API boundary (`to_dict`).
+
+        Orders are matched with each other by `key` (see `get_price_key`), not by `price`.
+        Price as it came to us (`raw_price`) is kept only to count the actions this saves.
+    """
+
+    __slots__ = ('pk', 'pair', 'order_type', 'price', 'amount', 'status', 'key', 'raw_price')
+
+    def __init__(self, price, amount, pair=None, order_type=None, pk=None, status=None, raw_price=None):
+        self.pk = pk
+        self.pair = pair
+        self.order_type = order_type
+        self.price = price
+        self.amount = amount
+        self.status = status
+        self.key = numeric.price_key(price)
+        self.raw_price = raw_price
+
+    def __repr__(self):
+        return "Order(pk={}, pair={}, order_type={}, price={}, amount={}, status={})".format(
+            self.pk, self.pair, self.order_type, self.price, self.amount, self.status)
+
+    def copy(self, **kwargs):
+        order = Order.__new__(Order)
+
+        for name in Order.__slots__:
+            setattr(order, name, getattr(self, name))
+
+        for name, value in kwargs.items():
+            setattr(order, name, value)
+
+        if 'price' in kwargs:
+            order.key = numeric.price_key(order.price)
+            order.raw_price = kwargs.get('raw_price')
+
+        return order
+
+    @staticmethod
+    def from_dict(data):
+        return Order(price=numeric.parse(data['price']),
+                     amount=numeric.parse(data['amount']),
+                     pair=data.get('pair'),
+                     order_type=data.get('order_type'),
+                     pk=data.get('pk'),
+                     status=data.get('status'),
+                     raw_price=str(data['price']))
+
+    def to_dict(self):
+        data = {
+            "pair": self.pair,
+            "order_type": self.order_type,
+            "price": serialize_decimal(self.price),
+            "amount": serialize_decimal(self.amount),
+            "need_approve": True
+        }
+
+        if self.pk is not None:
+            data['pk'] = self.pk
+
+        return data
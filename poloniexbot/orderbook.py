@@ -0,0 +1,226 @@
+import asyncio
+from bisect import bisect_left
+
+from poloniexbot import constants, numeric
+from poloniexbot.depth import DepthIndex
+from poloniexbot.order import get_price_key
+from poloniexbot.utils import cut_off_orders_vectorized, get_cost, numpy
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class OrderBookSide():
+    """
+        One side of the mirrored order book.
+
+        Levels are stored in a dict keyed by the price key (see `get_price_key`) and the keys
+        themselves are kept in a sorted list, so insert/update/delete of a level is a bisect
+        instead of re-sorting the whole side on every push update.
+
+        `changed` event is set every time tracked levels are changed, so that reconciler
+        might wait for it instead of polling the book, and price keys of the changed levels
+        are collected in `dirty` until reconciler takes them with `pop_dirty`.
+
+        Levels are kept best first: in ascending price order, or in descending one if `reverse`
+        is set (bids). In order to use the same bisect, `prices` and `levels` are keyed by the
+        sort key (see `get_sort_key`), while `dirty` keeps the price keys.
+
+        Cumulative depth of the side is kept in `index` (see `DepthIndex`), so that `cut_off`,
+        `fit` and `depth_at` do not walk the levels one by one. Levels are weighted by amount, or
+        by total (price * amount) if `by_total` is set, so that the balance of the buy side is in
+        the quote currency. If `vectorized` is set (and numpy is installed, and the side is not
+        `by_total`) amounts of the levels are also kept in the array, in the same order as
+        `prices`, and `cut_off` is done with numpy instead.
+    """
+
+    def __init__(self, depth=constants.COUNT, vectorized=False, reverse=False, by_total=False):
+        self.depth = depth
+        self.reverse = reverse
+        self.by_total = by_total
+        self.prices = []
+        self.levels = {}
+        self.changed = asyncio.Event()
+        self.dirty = set()
+        self.index = DepthIndex()
+
+        self.amounts = None
+        if vectorized and numpy is not None and not by_total:
+            # Amounts are always positive, so unsigned integers give us the whole `MAX_DIGITS` range.
+            dtype = numpy.uint64 if isinstance(numeric.arithmetic, numeric.FixedPointArithmetic) else object
+            self.amounts = numpy.zeros(depth + 1, dtype=dtype)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __iter__(self):
+        for price in self.prices:
+            yield self.levels[price]
+
+    def __getitem__(self, index):
+        return self.levels[self.prices[index]]
+
+    def __contains__(self, price):
+        return self.get_sort_key(get_price_key(price)) in self.levels
+
+    def get(self, price):
+        return self.levels.get(self.get_sort_key(get_price_key(price)))
+
+    def get_sort_key(self, key):
+        return -key if self.reverse else key
+
+    def get_weight(self, order):
+        # Dust levels are not mirrored (see `cut_off_orders`), so they cost us nothing.
+        if order.amount > numeric.cut_off_min_amount:
+            return get_cost(order, self.by_total)
+        return 0
+
+    def update(self, order):
+        """
+            Returns True if the tracked levels were changed.
+        """
+        price = self.get_sort_key(order.key)
+        is_zero_amount = order.amount == 0
+
+        if price in self.levels:
+            index = bisect_left(self.prices, price)
+
+            if is_zero_amount:
+                del self.prices[index]
+                del self.levels[price]
+                self.index.remove(price)
+
+                if self.amounts is not None:
+                    size = len(self.prices)
+                    self.amounts[index:size] = self.amounts[index + 1:size + 1]
+            else:
+                self.levels[price] = order
+                self.index.set(price, self.get_weight(order))
+
+                if self.amounts is not None:
+                    self.amounts[index] = order.amount
+
+        elif not is_zero_amount:
+            index = bisect_left(self.prices, price)
+
+            # Levels which are deeper than the book depth are not tracked.
+            if index >= self.depth:
+                return False
+
+            self.prices.insert(index, price)
+            self.levels[price] = order
+            self.index.set(price, self.get_weight(order))
+
+            if self.amounts is not None:
+                size = len(self.prices)
+                self.amounts[index + 1:size] = self.amounts[index:size - 1]
+                self.amounts[index] = order.amount
+
+            if len(self.prices) > self.depth:
+                evicted = self.prices.pop()
+                self.dirty.add(self.levels.pop(evicted).key)
+                self.index.remove(evicted)
+
+        else:
+            return False
+
+        self.dirty.add(order.key)
+        self.changed.set()
+        return True
+
+    def load(self, orders):
+        """
+            Replace the side with the given orders (e.g. the snapshot of the book) in one pass,
+            instead of inserting them one by one with `update`. Orders might be given in any
+            order (Poloniex gives them best first, which is the cheapest case for the sort),
+            levels with the same price are merged (last wins) and zero ones are skipped.
+        """
+        levels = {}
+        for order in orders:
+            levels[self.get_sort_key(order.key)] = order
+
+        prices = sorted(price for price, order in levels.items() if order.amount != 0)[:self.depth]
+
+        self.dirty.update([order.key for order in self.levels.values()])
+        self.dirty.update([levels[price].key for price in prices])
+
+        self.prices = prices
+        self.levels = {price: levels[price] for price in prices}
+        self.index.load(prices, [self.get_weight(self.levels[price]) for price in prices])
+
+        if self.amounts is not None:
+            self.amounts[:] = 0
+            self.amounts[:len(prices)] = [self.levels[price].amount for price in prices]
+
+        self.changed.set()
+
+    def orders(self):
+        """
+            Copies of the levels in price order, so that callers (e.g. `cut_off_orders`)
+            might modify them without touching the book itself.
+        """
+        return [self.levels[price].copy() for price in self.prices]
+
+    def cut_off(self, balance):
+        """
+            Same as `cut_off_orders(balance, self.orders(), self.by_total)`, but the cut off level
+            is taken from the depth index (or found with numpy, if the amounts array is kept).
+        """
+        if self.amounts is not None:
+            return cut_off_orders_vectorized(balance, self, amounts=self.amounts[:len(self.prices)])
+
+        _, key, rest = self.index.fit(balance)
+        end = len(self.prices) if key is None else bisect_left(self.prices, key)
+
+        orders = [self.levels[price] for price in self.prices[:end]
+                  if self.levels[price].amount > numeric.cut_off_min_amount]
+
+        if key is not None:
+            order = self.levels[key]
+            orders.append(order.copy(amount=numeric.divide(rest, order.price) if self.by_total else rest))
+
+        return orders
+
+    def fit(self, balance):
+        """
+            Number of the levels which fit in the balance entirely (see `DepthIndex.fit`).
+        """
+        count, _, _ = self.index.fit(balance)
+        return count
+
+    def depth_at(self, price):
+        """
+            Cumulative weight of the levels down to the given price (inclusive).
+        """
+        return self.index.depth(self.get_sort_key(get_price_key(price)))
+
+    def pop_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def clear(self):
+        self.dirty.update([order.key for order in self.levels.values()])
+        self.prices = []
+        self.levels = {}
+        self.index.clear()
+        self.changed.set()
+
+
+class OrderBook():
+    def __init__(self, depth=constants.COUNT, vectorized=constants.VECTORIZED_BOOK):
+        self.sides = {
+            'sell': OrderBookSide(depth=depth, vectorized=vectorized),
+            'buy': OrderBookSide(depth=depth, vectorized=vectorized, reverse=True, by_total=True)
+        }
+
+    def __getitem__(self, order_type):
+        return self.sides[order_type]
+
+    def update(self, order):
+        return self.sides[order.order_type].update(order)
+
+    def load(self, order_type, orders):
+        self.sides[order_type].load(orders)
+
+    def clear(self):
+        for side in self.sides.values():
+            side.clear()
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import time
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.order import Order
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+STATE_VERSION = 2
+
+
+def dump_order(order):
+    data = order.to_dict()
+    data['status'] = order.status
+    return data
+
+
+def load_order(data):
+    return Order.from_dict(data)
+
+
+class StateStore():
+    """
+        Warm restart state: the shadow of our own orders (see `OrderLedger`), kept in one JSON file,
+        which is rewritten as a whole into the temporary file and then renamed, so that the state on
+        disk is never half written.
+
+        State might be used only if the shadow was synced with the list of our orders not more than
+        `max_age` seconds ago. Book is not kept - it might not be trusted without the fresh snapshot,
+        which is taken on startup anyway.
+    """
+
+    def __init__(self, path, max_age=constants.STATE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+
+    @staticmethod
+    def dump(reconcilers):
+        """
+            State of the app with `reconcilers` by (pair, order type). Shadow is as stale as the
+            least recently synced ledger (None, if one of them was never synced).
+        """
+        ledgers = [reconciler.ledger for reconciler in reconcilers.values()]
+        synced = [ledger.synced for ledger in ledgers]
+
+        return {
+            'version': STATE_VERSION,
+            'time': time.time(),
+            'synced': None if None in synced else min(synced or [time.time()]),
+            'orders': [dump_order(order) for ledger in ledgers for order in ledger]
+        }
+
+    def save(self, state):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, path = tempfile.mkstemp(dir=directory, prefix=".state.")
+
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                json.dump(state, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(path, self.path)
+        except Exception:
+            os.unlink(path)
+            raise
+
+    def load(self):
+        """
+            Returns the saved state or None, if there is no usable one.
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("State {} could not be read: {}".format(self.path, e))
+            return None
+
+        if state.get('version') != STATE_VERSION:
+            logger.warning("State {} has unknown version {}".format(self.path, state.get('version')))
+            return None
+
+        age = time.time() - (state.get('synced') or 0)
+        if age > self.max_age:
+            logger.info("State {} is too old ({:.0f}s)".format(self.path, age))
+            return None
+
+        state['orders'] = [load_order(order) for order in state['orders']]
+        return state
@@ -0,0 +1,212 @@
+import asyncio
+import time
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants, metrics
+from poloniexbot.balance import BalanceCache
+from poloniexbot.dispatcher import dispatch
+from poloniexbot.ledger import OrderLedger
+from poloniexbot.utils import create_incremental_actions, counters
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class Reconciler():
+    """
+        Keeps Absortium orders of one order type in sync with one side of the mirrored book.
+
+        Reconciliation cycle is run when the book side signals a change (after `debounce`
+        seconds, so that a burst of push updates is handled by one cycle, and not more often
+        than every `min_interval` seconds), and at least once in `max_staleness` seconds,
+        so that changes on the Absortium side (e.g. fills) are noticed even if the book is quiet.
+
+        Only levels which were changed since the previous cycle (in the book or by the cut off)
+        are diffed. Full diff is done on the first cycle, on heartbeat and after failed actions.
+
+        Our Absortium orders are taken from the `ledger`, which is synced with the full list
+        of orders only once in `sync_interval` seconds or after failed actions, and the balance
+        is taken from the `balance` cache, which is refreshed after every ledger sync.
+
+        If `pair` is given, only our orders of this pair are mirrored, so that reconcilers of the
+        different pairs might share one account. If `scheduler` (semaphore shared by the
+        reconcilers of one process) is given, cycle is run only when the slot is acquired.
+        `shares` is the number of reconcilers which spend `from_currency` (see `BalanceCache`).
+        If `ready` is given, cycles are skipped while it returns False (e.g. while the book is
+        resynced after the gap in push updates, see `BookFeed.is_synced`).
+
+        Failed cycle does not stop the reconciler: state is invalidated, so that the next cycle
+        starts from the full list of orders, and the cycle is retried with the backoff.
+
+        Duration of the cycle and of its stages is observed in `poloniexbot.metrics`.
+    """
+
+    def __init__(self, client, side, order_type, from_currency, pair=None, scheduler=None, shares=1, ready=None,
+                 debounce=constants.RECONCILE_DEBOUNCE,
+                 min_interval=constants.RECONCILE_MIN_INTERVAL,
+                 max_staleness=constants.RECONCILE_MAX_STALENESS,
+                 sync_interval=constants.LEDGER_SYNC_INTERVAL,
+                 error_backoff=constants.RECONCILE_ERROR_BACKOFF):
+        self.client = client
+        self.side = side
+        self.order_type = order_type
+        self.from_currency = from_currency
+        self.pair = pair.lower() if pair else None
+        self.scheduler = scheduler
+        self.ready = ready
+
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.max_staleness = max_staleness
+        self.sync_interval = sync_interval
+        self.error_backoff = error_backoff
+
+        self.last_cycle = 0
+        self.ledger = OrderLedger()
+        self.balance = BalanceCache(client, from_currency, self.ledger, by_total=side.by_total, shares=shares)
+
+        # Poloniex orders, which we tried to mirror on the previous cycle.
+        self.target = {}
+        self.full = True
+
+    @property
+    def name(self):
+        return "{} {}".format(self.pair, self.order_type) if self.pair else self.order_type
+
+    async def wait(self):
+        try:
+            await asyncio.wait_for(self.side.changed.wait(), timeout=self.max_staleness)
+        except asyncio.TimeoutError:
+            logger.debug("Book was not changed for {}s, heartbeat cycle".format(self.max_staleness))
+            self.full = True
+
+        delay = max(self.debounce, self.last_cycle + self.min_interval - time.time())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Changes which will come while the cycle is running should trigger the next one.
+        self.side.changed.clear()
+
+    async def run(self):
+        failures = 0
+
+        while True:
+            # Failed cycle is retried even if the book is quiet.
+            if not failures:
+                await self.wait()
+
+            if not self.is_ready():
+                # Book is known to be wrong. Once it is synced, it is changed, and the full cycle is run.
+                logger.debug("{} book is not synced, skip the cycle".format(self.name))
+                self.full = True
+                failures = 0
+                continue
+
+            try:
+                if self.scheduler is None:
+                    self.last_cycle = time.time()
+                    await self.cycle()
+                else:
+                    async with self.scheduler:
+                        self.last_cycle = time.time()
+                        await self.cycle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                backoff = min(self.error_backoff * 2 ** (failures - 1), constants.RECONCILE_MAX_BACKOFF)
+
+                logger.error("{} cycle failed, retry in {:.1f}s: {}".format(self.name, backoff, e))
+                self.invalidate()
+                await asyncio.sleep(backoff)
+            else:
+                failures = 0
+
+    def is_ready(self):
+        return self.ready is None or self.ready()
+
+    def invalidate(self):
+        # We do not know which of the actions went through, so everything is taken afresh.
+        self.ledger.invalidate()
+        self.balance.invalidate()
+        self.full = True
+
+    async def list_orders(self):
+        params = {'order_type': self.order_type, 'status': constants.OPEN_ORDER_STATUSES}
+        if self.pair is not None:
+            params['pair'] = self.pair
+
+        orders = await self.client.orders.list_all(**params)
+
+        # In case the server does not filter, orders of the other side (or pair) are not ours to mirror.
+        return [order for order in orders
+                if order.get('order_type', self.order_type) == self.order_type and
+                (self.pair is None or order.get('pair', self.pair).lower() == self.pair)]
+
+    async def cycle(self):
+        with metrics.cycle_seconds.time(reconciler=self.name):
+            await self.run_stages()
+
+    def stage(self, name):
+        return metrics.stage_seconds.time(reconciler=self.name, stage=name)
+
+    async def run_stages(self):
+        started = time.time()
+
+        # 1. Sync the shadow of our Absortium orders, if it is time to.
+        if self.ledger.is_stale(self.sync_interval):
+            with self.stage('orders_list'):
+                self.ledger.sync(await self.list_orders())
+            self.balance.invalidate()
+            self.full = True
+
+        # 2. Get our 'init' and 'pending' Absortium orders.
+        absortium_orders = self.ledger.by_price
+
+        # 3. Calculate how many amount we have to operate with. We should take into account money
+        # restriction (Not all order from Poloniex will be synced, because we do not have such amount of money)
+        if self.balance.is_stale():
+            with self.stage('account_retrieve'):
+                await self.balance.refresh()
+        amount = await self.balance.get()
+
+        # 4. Get Poloniex orders and cut off redundant.
+        with self.stage('cut_off'):
+            poloniex_orders = self.side.cut_off(amount)
+            dirty = self.side.pop_dirty()
+
+        logger.debug("--" * 20 + "After cut" + "--" * 20)
+        logger.debug(poloniex_orders)
+
+        # 5. What should have to do to sync the orders?
+        with self.stage('diff'):
+            poloniex_orders = {order.key: order for order in poloniex_orders}
+
+            if self.full:
+                prices = set(absortium_orders.keys()) | set(poloniex_orders.keys())
+            else:
+                prices = dirty | self.get_shifted(poloniex_orders)
+
+            self.target = poloniex_orders
+            self.full = False
+
+            actions = create_incremental_actions(absortium_orders, poloniex_orders, prices)
+
+        logger.debug("--" * 20 + "Actions" + "--" * 20)
+        with self.stage('dispatch'):
+            results = await dispatch(self.client, actions)
+        self.ledger.apply(actions, results)
+
+        logger.info("{} cycle took {:.3f}s (checked: {}, delete: {}, update: {}, create: {}, "
+                    "avoided total: {})".format(self.name, time.time() - started, len(prices),
+            len(actions['delete']), len(actions['update']), len(actions['create']), counters['avoided_actions']))
+
+    def get_shifted(self, target):
+        """
+            Prices of the levels which are mirrored differently than on the previous cycle because
+            of the cut off (level is cut off or got in, or its amount is truncated differently).
+        """
+        return {price for price in set(target.keys()) | set(self.target.keys())
+                if price not in target or price not in self.target or
+                target[price].amount != self.target[price].amount}
@@ -0,0 +1,286 @@
+import asyncio
+import gzip
+import json
+import time
+from collections import Counter
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.feed import BookFeed
+from poloniexbot.orderbook import OrderBook
+from poloniexbot.reconciler import Reconciler
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+def open_file(path, mode):
+    # Recordings are long, so they might be gzipped. Plain ones are line buffered, gzipped ones
+    # are flushed by the `Recorder`.
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t")
+    return open(path, mode, buffering=1)
+
+
+class Recorder():
+    """
+        Writes the raw Poloniex push updates and book snapshots, with the time they came, into the
+        file - one JSON event per line, so that the session might be replayed later (see `Replayer`).
+
+        Gzip keeps everything in its buffer until it is flushed, so the file is flushed once in
+        `flush_interval` seconds - if the process is killed, only the last seconds are lost.
+    """
+
+    def __init__(self, path, flush_interval=constants.RECORD_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.file = open_file(path, "a")
+        self.flushed = time.time()
+
+    def record(self, kind, pair, data):
+        now = time.time()
+        event = {'time': now, 'kind': kind, 'pair': pair, 'data': data}
+        self.file.write(json.dumps(event, separators=(',', ':')) + "\n")
+
+        if now - self.flushed >= self.flush_interval:
+            self.flush()
+
+    def record_update(self, update):
+        self.record('update', update.get('currency_pair'), update)
+
+    def record_snapshot(self, pair, orders):
+        self.record('snapshot', pair, orders)
+
+    def flush(self):
+        self.file.flush()
+        self.flushed = time.time()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_events(path):
+    with open_file(path, "r") as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Last line of the recording, which was not closed properly, might be cut.
+                    logger.warning("Skip broken event in {}: {}".format(path, line[:100]))
+        except EOFError:
+            # Gzipped recording was not closed (e.g. process was killed), it ends with the last flush.
+            logger.warning("Recording {} is not closed properly".format(path))
+
+
+class StubOrders():
+    bulk_supported = False
+
+    # List filters the stub server honours, might be narrowed to mimic the server which ignores them.
+    filters = ['order_type', 'pair', 'status']
+
+    def __init__(self, calls, latency):
+        self.orders = {}
+        self.counter = 0
+        self.calls = calls
+        self.latency = latency
+
+    async def call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def list(self, **params):
+        await self.call('list')
+
+        filters = {name: value if isinstance(value, list) else [value] for name, value in params.items()
+                   if name in self.filters}
+        return [dict(order) for order in self.orders.values()
+                if all(order.get(name) in values for name, values in filters.items())]
+
+    async def list_all(self, **params):
+        return await self.list(**params)
+
+    async def create(self, **data):
+        await self.call('create')
+        self.counter += 1
+
+        order = dict(data, pk=self.counter, status='pending')
+        self.orders[order['pk']] = order
+        return dict(order)
+
+    async def update(self, pk, **data):
+        await self.call('update')
+        self.orders[pk].update(data)
+        return dict(self.orders[pk])
+
+    async def cancel(self, pk, **kwargs):
+        await self.call('cancel')
+        return self.orders.pop(pk)
+
+
+class StubAccounts():
+    def __init__(self, calls, orders, amount):
+        self.calls = calls
+        self.orders = orders
+        self.amount = D(amount)
+
+    def get_locked(self, currency):
+        # X_Y sell order locks its amount of Y, buy order locks its total in X.
+        locked = D(0)
+        for order in self.orders.orders.values():
+            quote, base = order['pair'].lower().split('_')
+
+            if order['order_type'] == 'sell' and base == currency:
+                locked += D(order['amount'])
+            elif order['order_type'] == 'buy' and quote == currency:
+                locked += D(order['price']) * D(order['amount'])
+
+        return locked
+
+    async def retrieve(self, currency):
+        self.calls['retrieve'] += 1
+        return {'currency': currency, 'amount': str(self.amount - self.get_locked(currency))}
+
+
+class StubClient():
+    """
+        Absortium stand-in: keeps the orders in memory and counts the calls. Orders are never
+        filled, every currency has the same `amount`, part of which is locked by the open orders.
+    """
+
+    def __init__(self, amount="1000000", latency=0):
+        self.calls = Counter()
+        self.orders = StubOrders(self.calls, latency)
+        self.accounts = StubAccounts(self.calls, self.orders, amount)
+
+    async def close(self):
+        pass
+
+
+class ReplayPublicApi():
+    """
+        Resync of the book during the replay gets the last recorded snapshot of the pair.
+    """
+
+    def __init__(self):
+        self.snapshots = {}
+
+    async def returnOrderBook(self, currencyPair, depth):
+        return self.snapshots.get(currencyPair, {'asks': [], 'bids': []})
+
+
+class Replayer():
+    """
+        Feeds the recorded session through the same path the live updates go (`BookFeed`, the book
+        and the reconcilers of both sides), against the `client` stub.
+
+        If `speed` is None, events are replayed as fast as possible and reconciliation cycle of the
+        changed sides is run after every event, otherwise the recorded timing is kept (`speed`
+        times faster) and reconcilers run on their own, as they do live.
+    """
+
+    def __init__(self, path, pairs=None, speed=None, client=None):
+        self.path = path
+        self.pairs = [pair.upper() for pair in pairs] if pairs else None
+        self.speed = speed
+        self.client = client or StubClient()
+
+        self.public_api = ReplayPublicApi()
+        self.feeds = {}
+        self.reconcilers = {}
+        self.stats = Counter()
+
+    def get_feed(self, pair):
+        if pair not in self.feeds:
+            book = OrderBook()
+            self.feeds[pair] = BookFeed(pair, book, self.public_api)
+
+            for order_type in ['sell', 'buy']:
+                quote, base = pair.lower().split('_')
+                self.reconcilers[(pair, order_type)] = Reconciler(
+                    self.client, book[order_type], order_type=order_type, pair=pair,
+                    from_currency=base if order_type == 'sell' else quote,
+                    ready=self.feeds[pair].is_synced,
+                    debounce=0 if self.speed is None else constants.RECONCILE_DEBOUNCE)
+
+        return self.feeds[pair]
+
+    def handle(self, event):
+        pair = (event['pair'] or '').upper()
+        if self.pairs is not None and pair not in self.pairs:
+            return False
+
+        feed = self.get_feed(pair)
+
+        if event['kind'] == 'snapshot':
+            self.public_api.snapshots[pair] = event['data']
+            feed.apply_snapshot(event['data'])
+        else:
+            feed.handle(event['data'])
+
+        self.stats[event['kind']] += 1
+        return True
+
+    async def reconcile(self):
+        for reconciler in list(self.reconcilers.values()):
+            # Change is kept until the book is resynced.
+            if reconciler.side.changed.is_set() and reconciler.is_ready():
+                reconciler.side.changed.clear()
+                await reconciler.cycle()
+                self.stats['cycles'] += 1
+
+    async def run(self):
+        started = time.time()
+        tasks = []
+        first = None
+
+        for event in read_events(self.path):
+            if self.speed is not None:
+                first = first if first is not None else event['time']
+                delay = (event['time'] - first) / self.speed - (time.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if not self.handle(event):
+                continue
+
+            if self.speed is None:
+                await self.reconcile()
+            else:
+                # Reconcilers of the pairs which just appeared in the recording.
+                for reconciler in list(self.reconcilers.values())[len(tasks):]:
+                    tasks.append(asyncio.ensure_future(reconciler.run()))
+
+                # Let the reconcilers run.
+                await asyncio.sleep(0)
+
+        if self.speed is None:
+            await self.reconcile()
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return self.report(time.time() - started)
+
+    def report(self, elapsed):
+        actions = sum([self.client.calls[name] for name in ['create', 'update', 'cancel']])
+
+        return {
+            'elapsed': elapsed,
+            'updates': self.stats['update'],
+            'snapshots': self.stats['snapshot'],
+            'cycles': self.stats['cycles'],
+            'actions': actions,
+            'calls': dict(self.client.calls),
+            'updates_per_second': self.stats['update'] / elapsed if elapsed else None,
+            'actions_per_second': actions / elapsed if elapsed else None,
+            'gaps': sum([feed.gaps for feed in self.feeds.values()])
+        }
@@ -12,9 +12,12 @@ https://docs.djangoproject.com/en/1.9/ref/settings/
 
 import os
 import sys
+from datetime import timedelta
 
 from kombu import Queue, Exchange
 
+from poloniexbot import constants
+
 docker_environments = {
     'SECRET_KEY': 'DJANGO_SECRET_KEY',
     'WHOAMI': 'WHOAMI',
@@ -37,6 +40,7 @@ for name, env_name in docker_environments.items():
 
 CELERY_BROKER = 'amqp://guest@docker.celery.broker//'
 CELERY_RESULT_BACKEND = 'redis://docker.celery.backend'
+PAIR_LOCK_REDIS = CELERY_RESULT_BACKEND
 
 MODE = getattr(settings_module, 'MODE')
 
@@ -63,8 +67,18 @@ INSTALLED_APPS = [
 CELERY_DEFAULT_QUEUE = 'poloniexbot'
 CELERY_QUEUES = (
     Queue('poloniexbot', Exchange('poloniexbot'), routing_key='poloniexbot'),
+) + tuple(
+    Queue(name, Exchange('poloniexbot'), routing_key=name)
+    for name in ["{}.{}".format(constants.CELERY_SHARD_QUEUE, shard) for shard in range(constants.CELERY_SHARDS)]
 )
 
+CELERYBEAT_SCHEDULE = {
+    'assign-pairs': {
+        'task': 'poloniexbot.celery.tasks.assign_pairs',
+        'schedule': timedelta(seconds=constants.ASSIGN_PAIRS_INTERVAL),
+    },
+}
+
 ETHNODE_URL = "docker.ethnode"
 
 REST_FRAMEWORK = {
@@ -0,0 +1,20 @@
+import asyncio
+
+__author__ = 'andrew.shvv@gmail.com'
+
+
+class EventLoopTestMixin():
+    """
+        Every test runs in its own event loop (`self.loop`), which is also set as the current one,
+        so that futures created without the explicit loop get into it.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        super().tearDown()
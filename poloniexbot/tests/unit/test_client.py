@@ -0,0 +1,144 @@
+import hashlib
+import hmac
+import json
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.client import AbsortiumClient, AbsortiumError, OrdersResource
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class FakeTransport():
+    def __init__(self, orders, page_size):
+        self.orders = orders
+        self.page_size = page_size
+        self.requests = []
+
+    async def request(self, method, path, params=None, data=None, unwrap=True):
+        self.requests.append(params)
+
+        orders = [order for order in self.orders if order['status'] in params.get('status', [order['status']])]
+
+        page = params['page']
+        results = orders[(page - 1) * self.page_size:page * self.page_size]
+        has_next = page * self.page_size < len(orders)
+
+        return {'count': len(orders), 'next': 'next' if has_next else None, 'results': results}
+
+
+class FakeAuth():
+    """
+        Requests auth, signs the prepared request as the auth of the sync client does.
+    """
+
+    def __call__(self, request):
+        message = request.method + request.path_url + (request.body or "")
+        request.headers['Signature'] = hmac.new(b"secret", message.encode(), hashlib.sha256).hexdigest()
+        return request
+
+
+class FakeResponse():
+    def __init__(self, status, content):
+        self.status = status
+        self.content = content
+
+    async def text(self):
+        return self.content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession():
+    closed = False
+
+    def __init__(self, status=200, content=""):
+        self.response = FakeResponse(status, content)
+        self.requests = []
+
+    def request(self, method, url, data=None, headers=None):
+        self.requests.append((method, url, data, headers))
+        return self.response
+
+
+class OrdersResourceTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def test_list_all(self):
+        orders = [{'pk': pk, 'status': 'pending' if pk % 3 else 'completed'} for pk in range(100)]
+        transport = FakeTransport(orders, page_size=10)
+
+        result = self.loop.run_until_complete(OrdersResource(transport).list_all(status=['init', 'pending']))
+
+        self.assertEqual([order['pk'] for order in result], [pk for pk in range(100) if pk % 3])
+        self.assertEqual(sorted(params['page'] for params in transport.requests), list(range(1, 8)))
+        self.assertEqual({tuple(params['status']) for params in transport.requests}, {('init', 'pending')})
+
+    def test_list_all_single_page(self):
+        transport = FakeTransport([{'pk': 1, 'status': 'init'}], page_size=10)
+
+        result = self.loop.run_until_complete(OrdersResource(transport).list_all())
+        self.assertEqual(result, [{'pk': 1, 'status': 'init'}])
+        self.assertEqual(len(transport.requests), 1)
+
+
+class AbsortiumClientTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def create_client(self, **response):
+        client = AbsortiumClient(base_api_uri="http://absortium/", auth=FakeAuth())
+        client.session = FakeSession(**response)
+        return client
+
+    def sign(self, message):
+        return hmac.new(b"secret", message.encode(), hashlib.sha256).hexdigest()
+
+    def test_signed_body(self):
+        client = self.create_client(content='{"pk": 1}')
+
+        result = self.loop.run_until_complete(client.orders.create(price="0.1", amount="1"))
+        self.assertEqual(result, {'pk': 1})
+
+        [(method, url, body, headers)] = client.session.requests
+        self.assertEqual((method, url), ("POST", "http://absortium/api/orders/"))
+        self.assertEqual(json.loads(body), {'price': "0.1", 'amount': "1"})
+        self.assertEqual(headers['Content-Type'], "application/json")
+
+        # Exactly what was sent is signed.
+        self.assertEqual(headers['Signature'], self.sign("POST/api/orders/" + body))
+
+    def test_signed_query(self):
+        client = self.create_client(content='[]')
+        self.loop.run_until_complete(client.orders.list(status=['init', 'pending']))
+
+        [(method, url, body, headers)] = client.session.requests
+        self.assertEqual(url, "http://absortium/api/orders/?status=init&status=pending")
+        self.assertIsNone(body)
+        self.assertEqual(headers['Signature'], self.sign("GET/api/orders/?status=init&status=pending"))
+
+    def test_unwrap(self):
+        content = json.dumps({'count': 1, 'next': None, 'results': [{'pk': 1}]})
+
+        client = self.create_client(content=content)
+        self.assertEqual(self.loop.run_until_complete(client.orders.list()), [{'pk': 1}])
+
+        # Pagination needs the whole response.
+        response = self.loop.run_until_complete(client.request("GET", "/api/orders/", unwrap=False))
+        self.assertEqual(response['count'], 1)
+
+        # Not paginated responses are returned as they are.
+        client = self.create_client(content='{"currency": "btc", "amount": "1"}')
+        account = self.loop.run_until_complete(client.accounts.retrieve(currency="btc"))
+        self.assertEqual(account, {'currency': "btc", 'amount': "1"})
+        self.assertEqual(client.session.requests[0][1], "http://absortium/api/accounts/btc/")
+
+    def test_error(self):
+        client = self.create_client(status=404, content="Not found")
+
+        with self.assertRaises(AbsortiumError) as context:
+            self.loop.run_until_complete(client.orders.cancel(pk=1))
+
+        self.assertEqual(context.exception.status, 404)
@@ -0,0 +1,136 @@
+import random
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import numeric
+from poloniexbot.depth import DepthIndex
+from poloniexbot.order import Order
+from poloniexbot.orderbook import OrderBookSide
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.utils import cut_off_orders
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class DepthIndexTest(PoloniexBotUnitTest):
+    def check_side(self, side):
+        orders = side.orders()
+        weights = [side.get_weight(order) for order in orders]
+
+        self.assertEqual(side.index.total(), sum(weights))
+
+        for index, order in enumerate(orders):
+            self.assertEqual(side.depth_at(order.price), sum(weights[:index + 1]))
+
+    def check_cut_off(self, side, balance):
+        expected = cut_off_orders(balance, side.orders(), by_total=side.by_total)
+        result = side.cut_off(balance)
+
+        self.assertEqual([(order.price, order.amount) for order in result],
+                         [(order.price, order.amount) for order in expected])
+
+        # Levels which fit entirely are the ones with the cumulative depth below the balance.
+        count = len([order for order in side.orders()
+                     if order.amount > numeric.cut_off_min_amount and side.depth_at(order.price) < balance])
+        self.assertEqual(side.fit(balance), count)
+
+    def check_random(self, **kwargs):
+        generator = random.Random(0)
+        side = OrderBookSide(depth=100, **kwargs)
+
+        for _ in range(500):
+            price = D("0.0167") + D(generator.randint(0, 300)).scaleb(-8)
+            amount = D(generator.choice([0, generator.randint(1, 10 ** 4), generator.randint(1, 10 ** 9)])).scaleb(-6)
+
+            side.update(Order(price=numeric.from_decimal(price), amount=numeric.from_decimal(amount)))
+
+            self.check_side(side)
+
+            total = numeric.to_decimal(side.index.total())
+            for fraction in ["0", "0.3", "0.999", "1", "2"]:
+                self.check_cut_off(side, numeric.from_decimal(total * D(fraction)))
+
+        side.clear()
+        self.assertEqual(len(side.index), 0)
+        self.assertEqual(side.cut_off(numeric.parse(1)), [])
+
+    def test_random(self):
+        self.check_random()
+
+    def test_random_fixed_point(self):
+        previous = numeric.arithmetic
+        numeric.set_arithmetic(numeric.FixedPointArithmetic())
+
+        try:
+            self.check_random()
+            self.check_random(reverse=True, by_total=True)
+        finally:
+            numeric.set_arithmetic(previous)
+
+    def test_random_buy_side(self):
+        self.check_random(reverse=True, by_total=True)
+
+    def test_free_slots(self):
+        index = DepthIndex()
+
+        for key, amount in [(1, 5), (3, 7), (5, 11)]:
+            index.set(key, D(amount))
+
+        # Removed level leaves the free slot, which is taken by the level next to it without rebuild.
+        index.remove(3)
+        self.assertEqual(index.keys, [1, 3, 5])
+
+        index.set(4, D(2))
+        self.assertEqual(index.keys, [1, 4, 5])
+        self.assertEqual(index.depth(4), D(7))
+        self.assertEqual(index.fit(D(8)), (2, 5, D(1)))
+
+        # There is no free slot next to the new level, so the tree is rebuilt by the next query.
+        index.set(2, D(1))
+        self.assertTrue(index.stale)
+        self.assertEqual(index.fit(D(100)), (4, None, None))
+        self.assertEqual(index.keys, [1, 2, 4, 5])
+        self.assertEqual(index.fit(D(100)), (4, None, None))
+        self.assertEqual(index.fit(D(0)), (0, 1, D(0)))
+
+    def test_update_does_not_rebuild(self):
+        index = DepthIndex()
+        index.load(range(0, 20000, 2), [D(1)] * 10000)
+
+        builds = []
+        build = index.build
+        index.build = lambda: builds.append(True) or build()
+
+        # Burst of push updates in the middle of the deep book - new levels, removals and changes -
+        # costs no rebuild, whatever the depth is...
+        generator = random.Random(0)
+        for _ in range(1000):
+            key = generator.randrange(20000)
+            if generator.random() < 0.2:
+                index.remove(key)
+            else:
+                index.set(key, D(generator.randint(0, 3)))
+        self.assertEqual(builds, [])
+
+        # ...the tree is rebuilt once, by the first query.
+        expected = DepthIndex()
+        expected.load(sorted(index.weights), [index.weights[key] for key in sorted(index.weights)])
+
+        for balance in [D(10), D(1000), D(100000)]:
+            self.assertEqual(index.fit(balance), expected.fit(balance))
+        self.assertEqual(index.depth(10000), expected.depth(10000))
+        self.assertEqual(len(builds), 1)
+
+    def test_append(self):
+        index = DepthIndex()
+        weights = [D(amount) for amount in range(1, 40)]
+
+        # New levels after the last one do not rebuild the tree.
+        for key, weight in enumerate(weights):
+            index.set(key, weight)
+
+        expected = DepthIndex()
+        expected.load(range(len(weights)), weights)
+        self.assertEqual((index.sums, index.counts), (expected.sums, expected.counts))
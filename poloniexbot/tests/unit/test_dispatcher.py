@@ -0,0 +1,182 @@
+import asyncio
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.client import AbsortiumError
+from poloniexbot.dispatcher import dispatch
+from poloniexbot.order import Order
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+FAIL_PK = -1
+
+
+class FakeOrders():
+    bulk_supported = False
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def call(self, action, order):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        await asyncio.sleep(0.01)
+
+        self.in_flight -= 1
+        self.calls.append(action)
+
+        if order.get('pk') == FAIL_PK:
+            raise Exception("Failed")
+
+        return dict(order, action=action)
+
+    async def cancel(self, **order):
+        return await self.call('delete', order)
+
+    async def update(self, **order):
+        return await self.call('update', order)
+
+    async def create(self, **order):
+        return await self.call('create', order)
+
+
+class FakeBulkOrders(FakeOrders):
+    bulk_supported = True
+
+    def __init__(self, status=None, error=None):
+        super().__init__()
+        self.status = status
+        self.error = error
+
+    async def bulk(self, **actions):
+        self.calls.append('bulk')
+
+        if self.status:
+            raise AbsortiumError(self.status, "")
+
+        if self.error:
+            raise self.error
+
+        return {
+            'delete': [{'pk': order['pk']} for order in actions['delete']],
+            'update': [{'error': "Not found"} for _ in actions['update']],
+            'create': [dict(order, pk=10) for order in actions['create']]
+        }
+
+
+class FakeClient():
+    def __init__(self, orders=None):
+        self.orders = orders or FakeOrders()
+
+
+class DispatcherTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def order(self, price='1', amount='1', pk=None):
+        return Order(pair='btc_eth', order_type='sell', price=D(price), amount=D(amount), pk=pk)
+
+    def dispatch(self, client, actions, **kwargs):
+        return self.loop.run_until_complete(dispatch(client, actions, **kwargs))
+
+    def test_deletes_first(self):
+        client = FakeClient()
+        actions = {
+            'delete': [self.order(pk=1), self.order(pk=2)],
+            'update': [self.order(pk=3)],
+            'create': [self.order()]
+        }
+
+        results = self.dispatch(client, actions)
+
+        self.assertEqual(client.orders.calls[:2], ['delete', 'delete'])
+        self.assertEqual(sorted(client.orders.calls[2:]), ['create', 'update'])
+        self.assertEqual(results['update'][0]['pk'], 3)
+        self.assertEqual(results['create'][0]['action'], 'create')
+        self.assertEqual(results['create'][0]['price'], '1')
+
+    def test_limit(self):
+        client = FakeClient()
+        actions = {
+            'delete': [],
+            'update': [],
+            'create': [self.order(price=str(price)) for price in range(10)]
+        }
+
+        self.dispatch(client, actions, limit=3)
+
+        self.assertEqual(len(client.orders.calls), 10)
+        self.assertEqual(client.orders.max_in_flight, 3)
+
+    def test_failure_does_not_stop_others(self):
+        client = FakeClient()
+        actions = {
+            'delete': [self.order(pk=FAIL_PK)],
+            'update': [],
+            'create': [self.order()]
+        }
+
+        results = self.dispatch(client, actions)
+
+        self.assertIsInstance(results['delete'][0], Exception)
+        self.assertEqual(results['create'][0]['action'], 'create')
+
+    def test_bulk(self):
+        client = FakeClient(FakeBulkOrders())
+        actions = {
+            'delete': [self.order(pk=1)],
+            'update': [self.order(pk=3)],
+            'create': [self.order()]
+        }
+
+        results = self.dispatch(client, actions)
+
+        self.assertEqual(client.orders.calls, ['bulk'])
+        self.assertEqual(results['delete'][0]['pk'], 1)
+        self.assertIsInstance(results['update'][0], Exception)
+        self.assertEqual(results['create'][0]['pk'], 10)
+
+    def test_bulk_fallback(self):
+        client = FakeClient(FakeBulkOrders(status=404))
+        actions = {
+            'delete': [self.order(pk=1)],
+            'update': [],
+            'create': [self.order()]
+        }
+
+        results = self.dispatch(client, actions)
+
+        self.assertEqual(client.orders.calls, ['bulk', 'delete', 'create'])
+        self.assertEqual(results['create'][0]['action'], 'create')
+        self.assertFalse(client.orders.bulk_supported)
+
+        # Second time bulk request should not be even tried.
+        self.dispatch(client, actions)
+        self.assertEqual(client.orders.calls.count('bulk'), 1)
+
+    def test_nothing_to_do(self):
+        client = FakeClient(FakeBulkOrders())
+
+        results = self.dispatch(client, {'delete': [], 'update': [], 'create': []})
+
+        self.assertEqual(client.orders.calls, [])
+        self.assertEqual(results, {'delete': [], 'update': [], 'create': []})
+
+    def test_bulk_transport_error(self):
+        client = FakeClient(FakeBulkOrders(error=ConnectionResetError()))
+        actions = {
+            'delete': [self.order(pk=1)],
+            'update': [],
+            'create': [self.order(), self.order(price='2')]
+        }
+
+        results = self.dispatch(client, actions)
+
+        self.assertEqual(client.orders.calls, ['bulk'])
+        self.assertIsInstance(results['delete'][0], ConnectionResetError)
+        self.assertEqual([type(result) for result in results['create']], [ConnectionResetError] * 2)
+        self.assertTrue(client.orders.bulk_supported)
@@ -0,0 +1,139 @@
+import asyncio
+from decimal import Decimal as D
+
+import mock
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.feed import BookFeed
+from poloniexbot.orderbook import OrderBook
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class FakePublicApi():
+    def __init__(self, books):
+        self.books = books
+        self.calls = []
+
+    async def returnOrderBook(self, currencyPair, depth):
+        self.calls.append(currencyPair)
+
+        book = self.books[currencyPair]
+        if isinstance(book, Exception):
+            raise book
+        return book
+
+
+class BookFeedTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def update(self, seq, rate, amount):
+        return {'type': constants.POLONIEX_ORDER_MODIFIED, 'seq': seq, 'currency_pair': 'BTC_ETH',
+                'data': {'type': 'ask', 'rate': rate, 'amount': amount}}
+
+    def levels(self, feed):
+        return [(order.price, order.amount) for order in feed.book['sell']]
+
+    def create_feed(self, pair, snapshot):
+        api = FakePublicApi({pair: snapshot})
+        feed = BookFeed(pair, OrderBook(), api)
+        self.loop.run_until_complete(feed.snapshot())
+        return feed
+
+    def test_sequence(self):
+        feed = self.create_feed('BTC_ETH', {'asks': [['0.1', '1']], 'bids': [], 'seq': 10})
+
+        # Stale update is skipped, updates of one message share the seq.
+        feed.handle(self.update(9, '0.1', '5'))
+        feed.handle(self.update(11, '0.2', '1'))
+        feed.handle(self.update(11, '0.3', '1'))
+
+        self.assertEqual(self.levels(feed), [(D('0.1'), 1), (D('0.2'), 1), (D('0.3'), 1)])
+        self.assertEqual(feed.seq, 11)
+        self.assertEqual(feed.gaps, 0)
+
+    def test_gap(self):
+        feed = self.create_feed('BTC_ETH', {'asks': [['0.1', '1']], 'bids': [], 'seq': 10})
+        other = self.create_feed('BTC_LTC', {'asks': [['0.5', '1']], 'bids': [], 'seq': 3})
+
+        feed.public_api.books['BTC_ETH'] = {'asks': [['0.2', '2']], 'bids': [['0.05', '1']], 'seq': 20}
+
+        # Message 11 is missed.
+        feed.handle(self.update(12, '0.3', '1'))
+        self.assertIsNotNone(feed.resyncing)
+        self.assertFalse(feed.is_synced())
+        self.assertTrue(other.is_synced())
+
+        # Updates which come while resync is in progress are overwritten by the snapshot.
+        feed.handle(self.update(13, '0.4', '1'))
+        self.loop.run_until_complete(feed.resyncing)
+
+        self.assertEqual(self.levels(feed), [(D('0.2'), 2)])
+        self.assertEqual([order.price for order in feed.book['buy']], [D('0.05')])
+        self.assertEqual((feed.seq, feed.gaps, feed.resyncing), (20, 1, None))
+        self.assertTrue(feed.is_synced())
+        self.assertEqual(feed.public_api.calls, ['BTC_ETH', 'BTC_ETH'])
+
+        # Other pair is not touched.
+        self.assertEqual(self.levels(other), [(D('0.5'), 1)])
+        self.assertEqual(other.public_api.calls, ['BTC_LTC'])
+
+    def test_failed_resync(self):
+        feed = self.create_feed('BTC_ETH', {'asks': [['0.1', '1']], 'bids': [], 'seq': 10})
+        feed.public_api.books['BTC_ETH'] = Exception("Service unavailable")
+
+        with mock.patch.object(constants, 'FEED_RESYNC_DELAY', 0.01):
+            # Message 11 is missed.
+            feed.handle(self.update(12, '0.2', '1'))
+            feed.handle(self.update(501, '0.3', '1'))
+            self.loop.run_until_complete(asyncio.sleep(0.05))
+
+            # Book is known to be wrong, so it is not synced until the snapshot is applied, and
+            # updates are kept.
+            self.assertGreater(len(feed.public_api.calls), 2)
+            self.assertFalse(feed.is_synced())
+            self.assertEqual(len(feed.buffer), 2)
+
+            feed.public_api.books['BTC_ETH'] = {'asks': [['0.2', '2']], 'bids': [], 'seq': 500}
+            self.loop.run_until_complete(asyncio.wait_for(feed.resyncing, 1))
+
+        self.assertTrue(feed.is_synced())
+        self.assertEqual(self.levels(feed), [(D('0.2'), 2), (D('0.3'), 1)])
+
+    def test_bootstrap(self):
+        api = FakePublicApi({'BTC_ETH': {'asks': [['0.1', '1'], ['0.2', '1']], 'bids': [], 'seq': 10}})
+        feed = BookFeed('BTC_ETH', OrderBook(), api)
+
+        # Updates which come before the snapshot is applied are buffered...
+        for update in [self.update(9, '0.1', '5'), self.update(10, '0.2', '5'), self.update(11, '0.3', '1')]:
+            feed.handle(update)
+        self.assertEqual(self.levels(feed), [])
+
+        # ... and only the ones which are newer than the snapshot are replayed.
+        self.loop.run_until_complete(feed.snapshot())
+        self.assertEqual(self.levels(feed), [(D('0.1'), 1), (D('0.2'), 1), (D('0.3'), 1)])
+        self.assertEqual((feed.seq, feed.buffer), (11, None))
+
+        feed.handle(self.update(12, '0.1', '2'))
+        self.assertEqual(self.levels(feed)[0], (D('0.1'), 2))
+
+    def test_gap_in_buffer(self):
+        api = FakePublicApi({'BTC_ETH': {'asks': [['0.1', '1']], 'bids': [], 'seq': 10}})
+        feed = BookFeed('BTC_ETH', OrderBook(), api)
+
+        feed.handle(self.update(11, '0.2', '1'))
+        feed.handle(self.update(13, '0.3', '1'))
+
+        self.loop.run_until_complete(feed.snapshot())
+        self.assertIsNotNone(feed.resyncing)
+
+        api.books['BTC_ETH'] = {'asks': [['0.1', '1'], ['0.3', '1']], 'bids': [], 'seq': 13}
+        self.loop.run_until_complete(feed.resyncing)
+
+        self.assertEqual(self.levels(feed), [(D('0.1'), 1), (D('0.3'), 1)])
+        self.assertEqual((feed.seq, feed.buffer), (13, None))
+        # Resync might have got the same stale snapshot before it was updated.
+        self.assertGreaterEqual(feed.gaps, 1)
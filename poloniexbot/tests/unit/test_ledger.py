@@ -0,0 +1,76 @@
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.ledger import OrderLedger
+from poloniexbot.order import Order, get_price_key
+from poloniexbot.tests.base import PoloniexBotUnitTest
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class OrderLedgerTest(PoloniexBotUnitTest):
+    def test_sync(self):
+        ledger = OrderLedger()
+        self.assertTrue(ledger.is_stale(60))
+
+        ledger.sync([
+            {'pk': 1, 'price': '1', 'amount': '1', 'status': 'pending'},
+            {'pk': 2, 'price': '2', 'amount': '1', 'status': 'completed'},
+            {'pk': 3, 'price': '3', 'amount': '1', 'status': 'init'},
+        ])
+
+        self.assertFalse(ledger.is_stale(60))
+        self.assertEqual(sorted(ledger.by_price.keys()), [get_price_key(D('1')), get_price_key(D('3'))])
+
+    def test_apply(self):
+        ledger = OrderLedger()
+        ledger.sync([
+            {'pk': 1, 'price': '1', 'amount': '1', 'status': 'pending'},
+            {'pk': 2, 'price': '2', 'amount': '1', 'status': 'pending'},
+        ])
+
+        actions = {
+            'delete': [Order(pk=1, price=D('1'), amount=D('1'))],
+            'update': [Order(pk=2, price=D('2'), amount=D('3'), status='pending')],
+            'create': [Order(price=D('4'), amount=D('1'))]
+        }
+        results = {
+            'delete': [None],
+            'update': [{'pk': 2, 'price': '2', 'amount': '3', 'status': 'pending'}],
+            'create': [{'pk': 5, 'price': '4', 'amount': '1', 'status': 'init'}]
+        }
+
+        ledger.apply(actions, results)
+
+        self.assertEqual(sorted(order.price for order in ledger), [D('2'), D('4')])
+        self.assertEqual(ledger.by_price[get_price_key(D('2'))].amount, 3)
+        self.assertEqual(ledger.by_price[get_price_key(D('4'))].pk, 5)
+        self.assertEqual(ledger.by_price[get_price_key(D('4'))].status, 'init')
+        self.assertFalse(ledger.is_stale(60))
+
+    def test_apply_failed(self):
+        ledger = OrderLedger()
+        ledger.sync([])
+
+        actions = {'delete': [], 'update': [], 'create': [Order(price=D('4'), amount=D('1'))]}
+        results = {'delete': [], 'update': [], 'create': [Exception()]}
+
+        ledger.apply(actions, results)
+
+        self.assertEqual(len(ledger), 0)
+        self.assertTrue(ledger.is_stale(60))
+
+    def test_apply_mismatch(self):
+        ledger = OrderLedger()
+        ledger.sync([{'pk': 1, 'price': '1', 'amount': '1', 'status': 'pending'}])
+
+        actions = {'delete': [], 'update': [Order(pk=1, price=D('1'), amount=D('2'), status='pending')], 'create': []}
+        results = {'delete': [], 'update': [{'pk': 1, 'price': '1', 'amount': '2', 'status': 'completed'}],
+                   'create': []}
+
+        ledger.apply(actions, results)
+
+        self.assertEqual(len(ledger), 0)
+        self.assertTrue(ledger.is_stale(60))
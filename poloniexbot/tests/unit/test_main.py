@@ -0,0 +1,199 @@
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.celery.sharding import LockLost
+from poloniexbot.main import PoloniexApp
+from poloniexbot.order import Order
+from poloniexbot.persistence import STATE_VERSION, StateStore
+from poloniexbot.reconciler import Reconciler
+from poloniexbot.replay import StubClient
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class FakePublicApi():
+    def __init__(self, books=None):
+        self.books = books or {}
+
+    async def returnOrderBook(self, currencyPair, depth):
+        return self.books.get(currencyPair, {'asks': [], 'bids': [], 'seq': 1})
+
+
+class FakePushApi():
+    def __init__(self):
+        self.handlers = {}
+
+    def subscribe(self, topic, handler):
+        self.handlers[topic] = handler
+
+
+class FakeLock():
+    key = "poloniexbot.lock.BTC_ETH"
+
+    def extend(self):
+        return False
+
+
+class PoloniexAppTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def create_app(self, books=None, **kwargs):
+        app = PoloniexApp(api_key="key", api_sec="secret", **kwargs)
+
+        app.push_api = FakePushApi()
+        app.public_api = FakePublicApi(books)
+        for feed in app.feeds.values():
+            feed.public_api = app.public_api
+
+        return app
+
+    def create_orders(self, client, *orders):
+        for pair, order_type, price in orders:
+            self.loop.run_until_complete(client.orders.create(pair=pair, order_type=order_type,
+                                                              price=price, amount="1"))
+
+    def run_startup(self, app):
+        """
+            Run the app until its lock is lost, reconcilers exit at once, so that the ledgers are
+            left as they are after the startup.
+        """
+
+        async def run(reconciler):
+            pass
+
+        with mock.patch.object(Reconciler, 'run', run):
+            with mock.patch.object(constants, 'PAIR_LOCK_EXTEND_INTERVAL', 0.01):
+                with self.assertRaises(LockLost):
+                    self.loop.run_until_complete(app.main())
+
+    def get_prices(self, app, pair, order_type):
+        return sorted(order.raw_price for order in app.reconcilers[(pair, order_type)].ledger)
+
+    def save_state(self, client, synced):
+        path = os.path.join(tempfile.mkdtemp(), "state.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+
+        StateStore(path).save({
+            'version': STATE_VERSION,
+            'time': time.time(),
+            'synced': synced,
+            'orders': list(client.orders.orders.values())
+        })
+        return path
+
+    def test_cancel(self):
+        client = StubClient()
+        self.create_orders(client, ('btc_eth', 'sell', '0.1'), ('btc_eth', 'buy', '0.05'), ('btc_ltc', 'sell', '0.01'))
+
+        app = self.create_app(pairs=['BTC_ETH'], lock=FakeLock(), client=client, adopt=False)
+        self.run_startup(app)
+
+        # Orders of the other pairs might be mirrored by the other workers.
+        self.assertEqual(client.calls['list'], 1)
+        self.assertEqual(client.calls['cancel'], 2)
+        self.assertEqual([order['pair'] for order in client.orders.orders.values()], ['btc_ltc'])
+
+        self.assertEqual(len(app.reconcilers[('BTC_ETH', 'sell')].ledger), 0)
+        self.assertEqual(len(app.reconcilers[('BTC_ETH', 'buy')].ledger), 0)
+
+    def test_adopt_duplicates(self):
+        client = StubClient()
+        self.create_orders(client, ('btc_eth', 'sell', '0.1'), ('btc_eth', 'sell', '0.1'), ('btc_eth', 'sell', '0.2'),
+                           ('btc_eth', 'buy', '0.05'), ('btc_ltc', 'sell', '0.01'))
+
+        app = self.create_app(pairs=['BTC_ETH'], lock=FakeLock(), client=client, adopt=True)
+        self.run_startup(app)
+
+        # Only the duplicate is cancelled, the rest of the orders are kept in the ledgers.
+        self.assertEqual(client.calls['list'], 1)
+        self.assertEqual(client.calls['cancel'], 1)
+        self.assertEqual(len(client.orders.orders), 4)
+
+        self.assertEqual(self.get_prices(app, 'BTC_ETH', 'sell'), ['0.1', '0.2'])
+        self.assertEqual(self.get_prices(app, 'BTC_ETH', 'buy'), ['0.05'])
+        self.assertIsNotNone(app.reconcilers[('BTC_ETH', 'sell')].ledger.synced)
+
+    def test_restore(self):
+        client = StubClient()
+        self.create_orders(client, ('btc_eth', 'sell', '0.1'), ('btc_eth', 'sell', '0.1'),
+                           ('btc_eth', 'buy', '0.05'), ('btc_ltc', 'sell', '0.01'))
+
+        synced = time.time() - 10
+        path = self.save_state(client, synced)
+
+        app = self.create_app(pairs=['BTC_ETH'], lock=FakeLock(), client=client, state_file=path)
+        self.run_startup(app)
+
+        # Orders are taken from the state as they were when the shadow was synced, without listing.
+        self.assertEqual(client.calls['list'], 0)
+        self.assertEqual(client.calls['cancel'], 1)
+
+        self.assertEqual(self.get_prices(app, 'BTC_ETH', 'sell'), ['0.1'])
+        self.assertEqual(self.get_prices(app, 'BTC_ETH', 'buy'), ['0.05'])
+        self.assertEqual(app.reconcilers[('BTC_ETH', 'sell')].ledger.synced, synced)
+        self.assertEqual(app.reconcilers[('BTC_ETH', 'buy')].ledger.synced, synced)
+
+    def test_restore_mismatched(self):
+        client = StubClient()
+        self.create_orders(client, ('btc_eth', 'sell', '0.1'), ('btc_eth', 'buy', '0.05'))
+
+        # Shadow is too old to be trusted, orders might be filled or cancelled since then.
+        path = self.save_state(client, time.time() - constants.STATE_MAX_AGE - 10)
+        self.loop.run_until_complete(client.orders.cancel(pk=1))
+        self.create_orders(client, ('btc_eth', 'sell', '0.2'))
+
+        app = self.create_app(pairs=['BTC_ETH'], lock=FakeLock(), client=client, state_file=path)
+        self.run_startup(app)
+
+        # Orders are listed and adopted instead.
+        self.assertEqual(client.calls['list'], 1)
+        self.assertEqual(self.get_prices(app, 'BTC_ETH', 'sell'), ['0.2'])
+        self.assertEqual(self.get_prices(app, 'BTC_ETH', 'buy'), ['0.05'])
+
+    def test_shares(self):
+        app = self.create_app(pairs=['BTC_ETH'], all_pairs=['BTC_ETH', 'BTC_LTC'], lock=FakeLock(),
+                              client=StubClient(), adopt=False)
+        self.run_startup(app)
+
+        # BTC is spent by the buy sides of both pairs, ETH only by the sell side of BTC_ETH.
+        self.assertEqual(app.reconcilers[('BTC_ETH', 'buy')].balance.currency, 'btc')
+        self.assertEqual(app.reconcilers[('BTC_ETH', 'buy')].balance.shares, 2)
+        self.assertEqual(app.reconcilers[('BTC_ETH', 'sell')].balance.currency, 'eth')
+        self.assertEqual(app.reconcilers[('BTC_ETH', 'sell')].balance.shares, 1)
+
+    def test_lock_lost(self):
+        app = self.create_app(pairs=['BTC_ETH', 'BTC_LTC'], lock=FakeLock(), client=StubClient())
+
+        with mock.patch.object(constants, 'PAIR_LOCK_EXTEND_INTERVAL', 0.01):
+            with self.assertRaises(LockLost):
+                self.loop.run_until_complete(app.main())
+
+        # Nothing of the app is left running, reconcilers of the pair might be run by another worker.
+        self.assertEqual(len(app.tasks), 5)
+        self.assertTrue(all(task.done() for task in app.tasks))
+
+    def test_close(self):
+        client = StubClient()
+        client.closed = False
+
+        async def close():
+            client.closed = True
+
+        client.close = close
+        app = self.create_app(pairs=['BTC_ETH'], lock=FakeLock(), client=client, metrics_port=0)
+
+        with mock.patch.object(constants, 'PAIR_LOCK_EXTEND_INTERVAL', 0.01):
+            with self.assertRaises(LockLost):
+                self.loop.run_until_complete(app.main())
+
+        # Session of the client and the metrics server are not left open on the loop.
+        self.assertTrue(client.closed)
+        self.assertIsNone(app.metrics_server)
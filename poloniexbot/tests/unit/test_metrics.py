@@ -0,0 +1,65 @@
+import asyncio
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.metrics import Histogram, Registry, start_metrics_server
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class MetricsTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def test_histogram(self):
+        histogram = Histogram("test_seconds", "Test", labels=['stage'], buckets=[0.1, 1])
+
+        histogram.observe(0.05, stage='diff')
+        histogram.observe(0.1, stage='diff')
+        histogram.observe(0.5, stage='diff')
+        histogram.observe(5, stage='diff')
+        histogram.observe(0.5, stage='cut_off')
+
+        lines = histogram.render().splitlines()
+        self.assertIn('# TYPE test_seconds histogram', lines)
+
+        # Buckets are cumulative, upper bound is inclusive.
+        self.assertIn('test_seconds_bucket{stage="diff",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{stage="diff",le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{stage="diff",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum{stage="diff"} 5.65', lines)
+        self.assertIn('test_seconds_count{stage="diff"} 4', lines)
+        self.assertIn('test_seconds_count{stage="cut_off"} 1', lines)
+
+    def test_time_on_failure(self):
+        histogram = Histogram("test_seconds", "Test")
+
+        with self.assertRaises(ValueError):
+            with histogram.time():
+                raise ValueError()
+
+        self.assertEqual(histogram.get_count(), 1)
+
+    def test_server(self):
+        registry = Registry()
+        registry.histogram("test_seconds", "Test").observe(0.2)
+
+        async def get(path):
+            server = await start_metrics_server(port=0, registry=registry)
+            port = server.sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write("GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n".format(path).encode())
+            response = await reader.read()
+            writer.close()
+
+            server.close()
+            await server.wait_closed()
+            return response.decode()
+
+        response = self.loop.run_until_complete(get("/metrics"))
+        self.assertTrue(response.startswith("HTTP/1.0 200 OK"))
+        self.assertIn('test_seconds_count 1', response)
+
+        response = self.loop.run_until_complete(get("/other"))
+        self.assertTrue(response.startswith("HTTP/1.0 404"))
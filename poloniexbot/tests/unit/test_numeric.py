@@ -0,0 +1,60 @@
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import numeric
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.utils import cut_off_orders, create_actions, convert
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class FixedPointTest(PoloniexBotUnitTest):
+    def setUp(self):
+        super().setUp()
+        self.previous = numeric.arithmetic
+        numeric.set_arithmetic(numeric.FixedPointArithmetic())
+
+    def tearDown(self):
+        numeric.set_arithmetic(self.previous)
+        super().tearDown()
+
+    def order(self, rate, amount):
+        return convert({'rate': rate, 'amount': amount, 'type': 'ask', 'pair': 'BTC_ETH'})
+
+    def test_conversion(self):
+        value = numeric.parse("0.01670620")
+
+        self.assertIsInstance(value, int)
+        self.assertEqual(value, 16706200000)
+        self.assertEqual(numeric.to_decimal(value), D("0.01670620"))
+        self.assertEqual(self.order("0.01670620", "1").to_dict()['price'], "0.016706200000")
+
+        with self.assertRaises(ValueError):
+            numeric.parse("10000000")
+
+    def test_cut_off_orders(self):
+        orders = [self.order('0.01670620', '1'), self.order('0.01671164', '8'), self.order('0.01671265', '10')]
+
+        orders = cut_off_orders(numeric.parse(10), orders)
+        self.assertEqual([numeric.to_decimal(order.amount) for order in orders], [1, 8, 1])
+
+    def test_create_actions(self):
+        absortium_order = self.order('0.0167', '1').copy(pk=1, status='pending')
+
+        actions = create_actions([absortium_order], [self.order('0.01670000', '2')])
+        self.assertEqual([order.pk for order in actions['update']], [1])
+        self.assertEqual(numeric.to_decimal(actions['update'][0].amount), 2)
+
+    def test_multiply_divide(self):
+        # Cost is rounded up and affordable amount is rounded down, so that we never overspend.
+        cost = numeric.multiply(numeric.parse("0.3"), numeric.parse("0.000000000001"))
+        self.assertEqual(numeric.to_decimal(cost), D("0.000000000001"))
+
+        amount = numeric.divide(numeric.parse("1"), numeric.parse("3"))
+        self.assertEqual(numeric.to_decimal(amount), D("0.333333333333"))
+
+        numeric.set_arithmetic(numeric.DecimalArithmetic())
+        self.assertEqual(numeric.multiply(D("0.3"), D("0.000000000001")), D("0.000000000001"))
+        self.assertEqual(numeric.divide(D("1"), D("3")), D("0.333333333333"))
@@ -0,0 +1,138 @@
+import random
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.order import Order, get_price_key
+from poloniexbot.orderbook import OrderBook
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.utils import update_storage, synchronize_orders, cut_off_orders
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class OrderBookTest(PoloniexBotUnitTest):
+    def order(self, price, amount, order_type='sell'):
+        return Order(pair='btc_eth', order_type=order_type, price=D(price), amount=D(amount))
+
+    def prices(self, side):
+        return [order.price for order in side]
+
+    def test_insert_sorted(self):
+        storage = OrderBook()
+        for price in ['0.3', '0.1', '0.2']:
+            update_storage(storage, self.order(price, '1'))
+
+        self.assertEqual(self.prices(storage['sell']), [D('0.1'), D('0.2'), D('0.3')])
+        self.assertEqual(len(storage['buy']), 0)
+
+    def test_update_same_price(self):
+        storage = OrderBook()
+        update_storage(storage, self.order('0.0167', '1'))
+        update_storage(storage, self.order('0.01670000', '2'))
+
+        self.assertEqual(len(storage['sell']), 1)
+        self.assertEqual(storage['sell'].get(D('0.0167')).amount, 2)
+
+    def test_remove(self):
+        storage = OrderBook()
+        update_storage(storage, self.order('0.1', '1'))
+        update_storage(storage, self.order('0.2', '1'))
+        update_storage(storage, self.order('0.1', '0'))
+
+        self.assertEqual(self.prices(storage['sell']), [D('0.2')])
+
+        # Removal of an unknown level should be ignored.
+        update_storage(storage, self.order('0.5', '0'))
+        self.assertEqual(self.prices(storage['sell']), [D('0.2')])
+
+    def test_depth(self):
+        storage = OrderBook(depth=2)
+        for price in ['0.3', '0.2', '0.4', '0.1']:
+            update_storage(storage, self.order(price, '1'))
+
+        self.assertEqual(self.prices(storage['sell']), [D('0.1'), D('0.2')])
+
+    def test_orders_are_copies(self):
+        storage = OrderBook()
+        update_storage(storage, self.order('0.1', '1'))
+
+        orders = storage['sell'].orders()
+        orders[0].amount = D('0.5')
+
+        self.assertEqual(storage['sell'].get(D('0.1')).amount, 1)
+
+    def test_dirty(self):
+        storage = OrderBook(depth=2)
+        update_storage(storage, self.order('0.1', '1'))
+        update_storage(storage, self.order('0.3', '1'))
+        storage['sell'].pop_dirty()
+
+        update_storage(storage, self.order('0.1', '2'))
+        update_storage(storage, self.order('0.5', '1'))
+        self.assertEqual(storage['sell'].pop_dirty(), {get_price_key(D('0.1'))})
+
+        # Level which is pushed out of the book depth is dirty too.
+        update_storage(storage, self.order('0.2', '1'))
+        self.assertEqual(storage['sell'].pop_dirty(), {get_price_key(D('0.2')), get_price_key(D('0.3'))})
+        self.assertEqual(storage['sell'].pop_dirty(), set())
+
+    def test_buy_side(self):
+        storage = OrderBook(depth=2)
+        for price in ['0.2', '0.1', '0.3']:
+            update_storage(storage, self.order(price, '1', order_type='buy'))
+
+        # Bids are kept best (highest) first, the lowest one is pushed out of the book depth.
+        self.assertEqual(self.prices(storage['buy']), [D('0.3'), D('0.2')])
+        self.assertEqual(storage['buy'].pop_dirty(), {get_price_key(D(price)) for price in ['0.1', '0.2', '0.3']})
+        self.assertIn(D('0.3'), storage['buy'])
+
+    def test_buy_side_cut_off(self):
+        storage = OrderBook()
+        update_storage(storage, self.order('0.2', '10', order_type='buy'))
+        update_storage(storage, self.order('0.1', '10', order_type='buy'))
+
+        # Balance of the buy side is in the quote currency: 2 for the first level, 0.5 left for 5 of the second.
+        orders = storage['buy'].cut_off(D('2.5'))
+        self.assertEqual([(order.price, order.amount) for order in orders], [(D('0.2'), 10), (D('0.1'), 5)])
+        self.assertEqual(storage['buy'].depth_at(D('0.1')), 3)
+
+    def test_load(self):
+        generator = random.Random(0)
+
+        for order_type in ['sell', 'buy']:
+            orders = [self.order(str(D(generator.randint(1, 300)).scaleb(-4)), str(generator.choice([0, 1, 2, 3])),
+                             order_type=order_type) for _ in range(200)]
+
+            # Last level with the price wins, best 50 of the non zero ones are kept.
+            levels = {order.price: order.amount for order in orders}
+            expected = sorted([(price, amount) for price, amount in levels.items() if amount],
+                              reverse=order_type == 'buy')[:50]
+
+            storage = OrderBook(depth=50)
+            update_storage(storage, self.order('0.5', '1', order_type=order_type))
+            storage[order_type].pop_dirty()
+            storage.load(order_type, orders)
+
+            side = storage[order_type]
+            self.assertEqual([(order.price, order.amount) for order in side], expected)
+            self.assertEqual([(order.price, order.amount) for order in side.cut_off(D(40))],
+                             [(order.price, order.amount) for order in cut_off_orders(D(40), side.orders(),
+                                                                                      by_total=side.by_total)])
+
+            # Replaced level is dirty too.
+            self.assertEqual(side.pop_dirty(), {order.key for order in side} | {get_price_key(D('0.5'))})
+
+            # Side is still updated incrementally after the load.
+            update_storage(storage, self.order(str(expected[0][0]), '0', order_type=order_type))
+            self.assertEqual([(order.price, order.amount) for order in side], expected[1:])
+
+    def test_synchronize_orders(self):
+        storage = OrderBook()
+        update_storage(storage, self.order('0.5', '1'))
+
+        synchronize_orders(storage, {'asks': [['0.1', '1'], ['0.2', '2']], 'bids': [['0.09', '1'], ['0.08', '1']]})
+
+        self.assertEqual(self.prices(storage['sell']), [D('0.1'), D('0.2')])
+        self.assertEqual(self.prices(storage['buy']), [D('0.09'), D('0.08')])
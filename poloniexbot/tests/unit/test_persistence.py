@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.ledger import OrderLedger
+from poloniexbot.order import Order
+from poloniexbot.persistence import StateStore
+from poloniexbot.tests.base import PoloniexBotUnitTest
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class FakeReconciler():
+    def __init__(self, orders):
+        self.ledger = OrderLedger()
+        self.ledger.load(orders)
+
+
+class StateStoreTest(PoloniexBotUnitTest):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "state.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def order(self, pk, price):
+        return Order(pk=pk, pair='btc_eth', order_type='sell', price=D(price), amount=D('1'), status='pending')
+
+    def test_save_load(self):
+        sell = FakeReconciler([self.order(7, '0.1')])
+        buy = FakeReconciler([self.order(8, '0.05').copy(order_type='buy')])
+        buy.ledger.synced -= 10
+
+        store = StateStore(self.path)
+        store.save(store.dump({('BTC_ETH', 'sell'): sell, ('BTC_ETH', 'buy'): buy}))
+
+        state = store.load()
+        self.assertEqual(sorted((order.pk, order.order_type, order.price, order.status) for order in state['orders']),
+                         [(7, 'sell', D('0.1'), 'pending'), (8, 'buy', D('0.05'), 'pending')])
+
+        # Shadow is as stale as the least recently synced ledger.
+        self.assertEqual(state['synced'], buy.ledger.synced)
+
+        # Temporary files are not left behind.
+        self.assertEqual(os.listdir(self.directory), ["state.json"])
+
+    def test_unusable_state(self):
+        store = StateStore(self.path, max_age=60)
+        self.assertIsNone(store.load())
+
+        reconciler = FakeReconciler([self.order(7, '0.1')])
+
+        # Shadow was synced too long ago...
+        reconciler.ledger.synced = time.time() - 120
+        store.save(store.dump({('BTC_ETH', 'sell'): reconciler}))
+        self.assertIsNone(store.load())
+
+        # ...or was not synced at all.
+        reconciler.ledger.invalidate()
+        store.save(store.dump({('BTC_ETH', 'sell'): reconciler}))
+        self.assertIsNone(store.load())
+
+        reconciler.ledger.synced = time.time()
+        state = store.dump({('BTC_ETH', 'sell'): reconciler})
+        state['version'] = 1
+        store.save(state)
+        self.assertIsNone(store.load())
+
+        with open(self.path, "w") as f:
+            f.write(json.dumps(state)[:10])
+        self.assertIsNone(store.load())
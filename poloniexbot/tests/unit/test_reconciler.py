@@ -0,0 +1,262 @@
+import asyncio
+from collections import Counter
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import metrics
+from poloniexbot.order import Order
+from poloniexbot.orderbook import OrderBookSide
+from poloniexbot.reconciler import Reconciler
+from poloniexbot.replay import StubClient
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class ReconcilerTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def order(self, price, amount):
+        return Order(pair='btc_eth', order_type='sell', price=D(price), amount=D(amount))
+
+    def create_reconciler(self, side, client, **kwargs):
+        return Reconciler(client, side, order_type='sell', from_currency='eth', **kwargs)
+
+    def test_cycle(self):
+        side = OrderBookSide()
+        client = StubClient()
+        reconciler = self.create_reconciler(side, client)
+
+        side.update(self.order('0.1', '1'))
+        side.update(self.order('0.2', '2'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        prices = sorted(order['price'] for order in client.orders.orders.values())
+        self.assertEqual(prices, ['0.1', '0.2'])
+
+        side.update(self.order('0.1', '0'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        prices = sorted(order['price'] for order in client.orders.orders.values())
+        self.assertEqual(prices, ['0.2'])
+
+    def test_incremental_cycle(self):
+        side = OrderBookSide()
+        client = StubClient(amount='3')
+        reconciler = self.create_reconciler(side, client)
+
+        side.update(self.order('0.1', '1'))
+        side.update(self.order('0.2', '1'))
+        side.update(self.order('0.3', '5'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        amounts = {order['price']: order['amount'] for order in client.orders.orders.values()}
+        self.assertEqual(amounts, {'0.1': '1', '0.2': '1', '0.3': '1'})
+
+        # Level is changed, and because of the cut off the deeper one has to be updated too.
+        side.update(self.order('0.1', '2'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        amounts = {order['price']: order['amount'] for order in client.orders.orders.values()}
+        self.assertEqual(amounts, {'0.1': '2', '0.2': '1'})
+        self.assertFalse(reconciler.full)
+
+    def test_no_list_in_steady_state(self):
+        side = OrderBookSide()
+        client = StubClient()
+        reconciler = self.create_reconciler(side, client)
+
+        side.update(self.order('0.1', '1'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        side.update(self.order('0.2', '1'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        side.update(self.order('0.1', '0'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        self.assertEqual(client.calls['list'], 1)
+        self.assertEqual(client.calls['retrieve'], 1)
+        self.assertEqual(sorted(order.price for order in reconciler.ledger), [D('0.2')])
+        self.assertEqual(sorted(order['price'] for order in client.orders.orders.values()), ['0.2'])
+
+    def test_wait_for_change(self):
+        side = OrderBookSide()
+        reconciler = self.create_reconciler(side, StubClient(), debounce=0, min_interval=0, max_staleness=10)
+
+        self.loop.call_later(0.01, side.update, self.order('0.1', '1'))
+        started = self.loop.time()
+        self.loop.run_until_complete(reconciler.wait())
+
+        self.assertLess(self.loop.time() - started, 1)
+        self.assertFalse(side.changed.is_set())
+
+    def test_wait_heartbeat(self):
+        side = OrderBookSide()
+        reconciler = self.create_reconciler(side, StubClient(), debounce=0, min_interval=0, max_staleness=0.01)
+
+        self.loop.run_until_complete(reconciler.wait())
+        self.assertFalse(side.changed.is_set())
+
+    def test_pair(self):
+        side = OrderBookSide()
+        client = StubClient()
+        # Server which does not filter the list.
+        client.orders.filters = ['status']
+        client.orders.orders[100] = {'pk': 100, 'pair': 'btc_ltc', 'order_type': 'sell',
+                                     'price': '0.1', 'amount': '1', 'status': 'pending'}
+
+        reconciler = self.create_reconciler(side, client, pair='BTC_ETH')
+        side.update(self.order('0.2', '1'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        # Order of the other pair is not ours to cancel.
+        self.assertIn(100, client.orders.orders)
+        self.assertEqual(sorted(order.price for order in reconciler.ledger), [D('0.2')])
+
+    def test_other_side(self):
+        side = OrderBookSide()
+        client = StubClient()
+        # Server which does not filter the list.
+        client.orders.filters = ['status']
+        client.orders.orders[100] = {'pk': 100, 'pair': 'btc_eth', 'order_type': 'buy',
+                                     'price': '0.05', 'amount': '1', 'status': 'pending'}
+
+        reconciler = self.create_reconciler(side, client, pair='BTC_ETH')
+        side.update(self.order('0.2', '1'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        # Buy order is mirrored by the other reconciler.
+        self.assertIn(100, client.orders.orders)
+        self.assertEqual(sorted(order.price for order in reconciler.ledger), [D('0.2')])
+
+    def test_scheduler(self):
+        scheduler = asyncio.Semaphore(1)
+        running = []
+
+        reconcilers = []
+        for _ in range(3):
+            side = OrderBookSide()
+            reconciler = self.create_reconciler(side, StubClient(), scheduler=scheduler,
+                                                debounce=0, min_interval=0, max_staleness=0.01)
+
+            async def cycle(reconciler=reconciler):
+                running.append(reconciler)
+                self.assertTrue(scheduler.locked())
+                await asyncio.sleep(0.01)
+
+            reconciler.cycle = cycle
+            reconcilers.append(reconciler)
+
+        tasks = [asyncio.ensure_future(reconciler.run()) for reconciler in reconcilers]
+        self.loop.run_until_complete(asyncio.sleep(0.2))
+
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+        # Every pair got its turn.
+        for reconciler in reconcilers:
+            self.assertGreater(running.count(reconciler), 1)
+
+    def test_failed_cycle(self):
+        side = OrderBookSide()
+        client = StubClient()
+        reconciler = self.create_reconciler(side, client, debounce=0, min_interval=0, max_staleness=10,
+                                            error_backoff=0.01)
+
+        retrieve = client.accounts.retrieve
+
+        async def fail_once(currency):
+            client.accounts.retrieve = retrieve
+            raise Exception("Service unavailable")
+
+        client.accounts.retrieve = fail_once
+
+        side.update(self.order('0.1', '1'))
+        task = asyncio.ensure_future(reconciler.run())
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+
+        # Reconciler is still running, and the failed cycle is retried without waiting for the book change.
+        self.assertFalse(task.done())
+        self.assertEqual(sorted(order['price'] for order in client.orders.orders.values()), ['0.1'])
+        self.assertEqual(client.calls['list'], 2)
+
+        task.cancel()
+        self.loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+
+    def test_not_ready(self):
+        side = OrderBookSide()
+        client = StubClient()
+        synced = []
+        reconciler = self.create_reconciler(side, client, debounce=0, min_interval=0, max_staleness=0.01,
+                                            ready=lambda: bool(synced))
+
+        side.update(self.order('0.1', '1'))
+        task = asyncio.ensure_future(reconciler.run())
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+
+        # Book is not synced, nothing is sent, even on heartbeat.
+        self.assertEqual(client.calls, Counter())
+
+        synced.append(True)
+        side.update(self.order('0.2', '1'))
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+
+        self.assertEqual(sorted(order['price'] for order in client.orders.orders.values()), ['0.1', '0.2'])
+
+        task.cancel()
+        self.loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+
+    def test_buy_side(self):
+        side = OrderBookSide(reverse=True, by_total=True)
+        client = StubClient(amount='1')
+        reconciler = Reconciler(client, side, order_type='buy', from_currency='btc')
+
+        side.update(self.order('0.1', '10').copy(order_type='buy'))
+        side.update(self.order('0.2', '10').copy(order_type='buy'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        # We buy the best bid first, for all the btc we have.
+        orders = [(order['order_type'], order['price'], order['amount']) for order in client.orders.orders.values()]
+        self.assertEqual(orders, [('buy', '0.2', '5.000000000000')])
+
+    def test_shares(self):
+        client = StubClient(amount='10')
+        reconciler = self.create_reconciler(OrderBookSide(), client, shares=2)
+
+        self.assertEqual(self.loop.run_until_complete(reconciler.balance.get()), D('5'))
+
+    def test_adopted_orders(self):
+        side = OrderBookSide()
+        client = StubClient()
+        for price, amount in [('0.1', '1'), ('0.2', '1')]:
+            self.loop.run_until_complete(client.orders.create(**self.order(price, amount).to_dict()))
+        client.calls.clear()
+
+        reconciler = self.create_reconciler(side, client)
+        reconciler.ledger.sync(list(client.orders.orders.values()))
+
+        side.update(self.order('0.1', '1'))
+        side.update(self.order('0.2', '3'))
+        self.loop.run_until_complete(reconciler.cycle())
+
+        # Only the difference with the book is sent.
+        self.assertEqual([client.calls[name] for name in ['create', 'update', 'cancel']], [0, 1, 0])
+
+    def test_stage_metrics(self):
+        side = OrderBookSide()
+        client = StubClient()
+        reconciler = self.create_reconciler(side, client, pair='metrics_test')
+
+        side.update(self.order('0.1', '1'))
+        self.loop.run_until_complete(reconciler.cycle())
+        self.loop.run_until_complete(reconciler.cycle())
+
+        self.assertEqual(metrics.cycle_seconds.get_count(reconciler=reconciler.name), 2)
+
+        # Orders are listed and account is retrieved only on the first cycle.
+        counts = {stage: metrics.stage_seconds.get_count(reconciler=reconciler.name, stage=stage)
+                  for stage in ['orders_list', 'account_retrieve', 'cut_off', 'diff', 'dispatch']}
+        self.assertEqual(counts, {'orders_list': 1, 'account_retrieve': 1, 'cut_off': 2, 'diff': 2, 'dispatch': 2})
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal as D
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import constants
+from poloniexbot.replay import Recorder, Replayer, read_events
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.tests.mixins.loop import EventLoopTestMixin
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class ReplayTest(EventLoopTestMixin, PoloniexBotUnitTest):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def update(self, seq, rate, amount, order_type='ask'):
+        return {'type': constants.POLONIEX_ORDER_MODIFIED, 'seq': seq, 'currency_pair': 'BTC_ETH',
+                'data': {'type': order_type, 'rate': rate, 'amount': amount}}
+
+    def record(self, name):
+        path = os.path.join(self.directory, name)
+
+        recorder = Recorder(path)
+        recorder.record_update(self.update(10, '0.3', '1'))
+        recorder.record_snapshot('BTC_ETH', {'asks': [['0.1', '1']], 'bids': [['0.09', '1']], 'seq': 10})
+        recorder.record_update(self.update(11, '0.2', '1'))
+        recorder.record_update(self.update(12, '0.08', '1', order_type='bid'))
+        recorder.record_update(self.update(13, '0.1', '2'))
+        recorder.close()
+
+        return path
+
+    def check(self, replayer, report):
+        self.assertEqual((report['updates'], report['snapshots'], report['gaps']), (4, 1, 0))
+
+        book = replayer.feeds['BTC_ETH'].book
+        self.assertEqual([(order.price, order.amount) for order in book['sell']], [(D('0.1'), 2), (D('0.2'), 1)])
+
+        # Our orders follow the book.
+        orders = sorted((order['order_type'], order['price'], order['amount'])
+                        for order in replayer.client.orders.orders.values())
+        self.assertEqual(orders, [('buy', '0.08', '1'), ('buy', '0.09', '1'), ('sell', '0.1', '2'), ('sell', '0.2', '1')])
+
+        self.assertEqual(report['actions'], 5)
+        self.assertGreater(report['actions_per_second'], 0)
+
+    def test_killed_recording(self):
+        path = os.path.join(self.directory, "killed.jsonl.gz")
+
+        # Nothing is lost, if the gzipped recording is flushed on every event.
+        recorder = Recorder(path, flush_interval=0)
+        for seq in range(10, 13):
+            recorder.record_update(self.update(seq, '0.1', '1'))
+
+        # Recording is read without being closed, as if the process was killed.
+        self.assertEqual([event['data']['seq'] for event in read_events(path)], [10, 11, 12])
+        recorder.close()
+
+    def test_replay(self):
+        for name in ["session.jsonl", "session.jsonl.gz"]:
+            path = self.record(name)
+            self.assertEqual([event['kind'] for event in read_events(path)],
+                             ['update', 'snapshot', 'update', 'update', 'update'])
+
+            replayer = Replayer(path)
+            self.check(replayer, self.loop.run_until_complete(replayer.run()))
+
+    def test_replay_real_time(self):
+        replayer = Replayer(self.record("session.jsonl"), speed=1000)
+        report = self.loop.run_until_complete(replayer.run())
+
+        # Reconcilers run on their own, so the last changes might not be mirrored yet.
+        self.assertEqual((report['updates'], report['snapshots']), (4, 1))
+
+    def test_replay_pairs(self):
+        replayer = Replayer(self.record("session.jsonl"), pairs=['BTC_LTC'])
+        report = self.loop.run_until_complete(replayer.run())
+
+        self.assertEqual((report['updates'], report['actions']), (0, 0))
@@ -0,0 +1,79 @@
+import time
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot.celery.sharding import PairLock, get_shard, get_shard_queue, EXTEND_SCRIPT, RELEASE_SCRIPT
+from poloniexbot.tests.base import PoloniexBotUnitTest
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+class FakeRedis():
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= time.time():
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self.get(key) is not None:
+            return None
+
+        self.values[key] = (value, time.time() + px / 1000)
+        return True
+
+    def exists(self, key):
+        return int(self.get(key) is not None)
+
+    def eval(self, script, numkeys, key, token, *args):
+        if self.get(key) != token:
+            return 0
+
+        if script == EXTEND_SCRIPT:
+            self.values[key] = (token, time.time() + args[0] / 1000)
+        elif script == RELEASE_SCRIPT:
+            del self.values[key]
+
+        return 1
+
+
+class ShardingTest(PoloniexBotUnitTest):
+    def test_shard(self):
+        self.assertEqual(get_shard("BTC_ETH", 4), get_shard("btc_eth", 4))
+        self.assertEqual(get_shard_queue("BTC_ETH", 4), "poloniexbot.shard.{}".format(get_shard("BTC_ETH", 4)))
+
+        shards = {get_shard("BTC_{}".format(currency), 4) for currency in ["ETH", "LTC", "XMR", "DASH", "ZEC", "ETC"]}
+        self.assertGreater(len(shards), 1)
+
+    def test_lock(self):
+        redis = FakeRedis()
+
+        lock = PairLock(redis, "BTC_ETH")
+        other = PairLock(redis, "btc_eth")
+
+        self.assertTrue(lock.acquire())
+        self.assertFalse(other.acquire())
+        self.assertTrue(other.is_locked())
+
+        # Only the owner might extend or release the lock.
+        self.assertFalse(other.extend())
+        self.assertFalse(other.release())
+        self.assertTrue(lock.extend())
+
+        self.assertTrue(lock.release())
+        self.assertTrue(other.acquire())
+
+    def test_lock_expires(self):
+        redis = FakeRedis()
+
+        lock = PairLock(redis, "BTC_ETH", ttl=0.01)
+        self.assertTrue(lock.acquire())
+
+        time.sleep(0.02)
+        self.assertFalse(lock.extend())
+        self.assertTrue(PairLock(redis, "BTC_ETH").acquire())
@@ -1,8 +1,11 @@
 from decimal import Decimal as D
 
 from core.utils.logging import getPrettyLogger
+from poloniexbot import numeric
+from poloniexbot.order import Order, get_price_key
 from poloniexbot.tests.base import PoloniexBotUnitTest
-from poloniexbot.utils import cut_off_orders, create_actions
+from poloniexbot.utils import cut_off_orders, create_actions, create_incremental_actions, convert, counters, \
+    split_duplicates
 
 __author__ = 'andrew.shvv@gmail.com'
 
@@ -10,12 +13,15 @@ logger = getPrettyLogger(__name__)
 
 
 class UpdateTest(PoloniexBotUnitTest):
+    def orders(self, orders):
+        return [Order.from_dict(order) for order in orders]
+
     def init_check(self, actions):
         def check(action, pk=None, price=None):
             if pk:
-                return pk in [order['pk'] for order in actions[action]]
+                return pk in [order.pk for order in actions[action]]
             elif price:
-                return price in [order['price'] for order in actions[action]]
+                return D(price) in [order.price for order in actions[action]]
 
         return check
 
@@ -36,11 +42,11 @@ class UpdateTest(PoloniexBotUnitTest):
             }
         ]
 
-        orders = cut_off_orders(balance, poloniex_orders)
+        orders = cut_off_orders(balance, self.orders(poloniex_orders))
         self.assertEqual(len(orders), 3)
-        self.assertEqual(D(orders[0]['amount']), 1)
-        self.assertEqual(D(orders[1]['amount']), 8)
-        self.assertEqual(D(orders[2]['amount']), 1)
+        self.assertEqual(orders[0].amount, 1)
+        self.assertEqual(orders[1].amount, 8)
+        self.assertEqual(orders[2].amount, 1)
 
     def test_cut_off_orders_zero(self):
         balance = 10
@@ -55,10 +61,10 @@ class UpdateTest(PoloniexBotUnitTest):
             }
         ]
 
-        orders = cut_off_orders(balance, poloniex_orders)
+        orders = cut_off_orders(balance, self.orders(poloniex_orders))
         self.assertEqual(len(orders), 2)
-        self.assertEqual(D(orders[0]['amount']), 1)
-        self.assertEqual(D(orders[1]['amount']), 9)
+        self.assertEqual(orders[0].amount, 1)
+        self.assertEqual(orders[1].amount, 9)
 
     def test_cut_off_orders_long(self):
         balance = 10
@@ -81,17 +87,17 @@ class UpdateTest(PoloniexBotUnitTest):
             }
         ]
 
-        orders = cut_off_orders(balance, poloniex_orders)
+        orders = cut_off_orders(balance, self.orders(poloniex_orders))
         self.assertEqual(len(orders), 3)
-        self.assertEqual(D(orders[0]['amount']), 1)
-        self.assertEqual(D(orders[1]['amount']), 8)
-        self.assertEqual(D(orders[2]['amount']), 1)
+        self.assertEqual(orders[0].amount, 1)
+        self.assertEqual(orders[1].amount, 8)
+        self.assertEqual(orders[2].amount, 1)
 
     def test_action_without_update(self):
         poloniex_orders = [{'price': '1', 'amount': 1}]
         absortium_orders = [{'pk': 1, 'price': '1', 'amount': '1'}]
 
-        actions = create_actions(absortium_orders, poloniex_orders)
+        actions = create_actions(self.orders(absortium_orders), self.orders(poloniex_orders))
         check = self.init_check(actions)
         self.assertEqual(check(pk=1, action='update'), False)
 
@@ -99,7 +105,7 @@ class UpdateTest(PoloniexBotUnitTest):
         poloniex_orders = [{'price': '1', 'amount': 2}]
         absortium_orders = [{'pk': 1, 'price': '1', 'amount': '1'}]
 
-        actions = create_actions(absortium_orders, poloniex_orders)
+        actions = create_actions(self.orders(absortium_orders), self.orders(poloniex_orders))
         check_that = self.init_check(actions)
 
         self.assertEqual(check_that(pk=1, action='update'), True)
@@ -108,7 +114,7 @@ class UpdateTest(PoloniexBotUnitTest):
         poloniex_orders = [{'price': '2', 'amount': 1}]
         absortium_orders = []
 
-        actions = create_actions(absortium_orders, poloniex_orders)
+        actions = create_actions(self.orders(absortium_orders), self.orders(poloniex_orders))
         check_that = self.init_check(actions)
 
         self.assertEqual(check_that(price='2', action='create'), True)
@@ -117,7 +123,81 @@ class UpdateTest(PoloniexBotUnitTest):
         poloniex_orders = []
         absortium_orders = [{'pk': 1, 'price': '2', 'amount': 1}]
 
-        actions = create_actions(absortium_orders, poloniex_orders)
+        actions = create_actions(self.orders(absortium_orders), self.orders(poloniex_orders))
         check_that = self.init_check(actions)
 
         self.assertEqual(check_that(pk=1, action='delete'), True)
+
+    def test_incremental_actions(self):
+        poloniex_orders = self.orders([
+            {'price': '1', 'amount': '2'},
+            {'price': '2', 'amount': '1'},
+            {'price': '3', 'amount': '1'}
+        ])
+        absortium_orders = self.orders([
+            {'pk': 1, 'price': '1', 'amount': '1'},
+            {'pk': 4, 'price': '4', 'amount': '1'}
+        ])
+
+        poloniex_orders = {order.key: order for order in poloniex_orders}
+        absortium_orders = {order.key: order for order in absortium_orders}
+        prices = {get_price_key(D(price)) for price in ['1', '3', '5']}
+
+        actions = create_incremental_actions(absortium_orders, poloniex_orders, prices)
+        check_that = self.init_check(actions)
+
+        self.assertEqual(check_that(pk=1, action='update'), True)
+        self.assertEqual(check_that(price='3', action='create'), True)
+
+        # Not changed levels are not checked.
+        self.assertEqual(check_that(price='2', action='create'), False)
+        self.assertEqual(check_that(pk=4, action='delete'), False)
+
+        # Absortium orders should not be changed in place.
+        self.assertEqual(absortium_orders[get_price_key(D('1'))].amount, 1)
+
+    def test_action_canonical_price(self):
+        poloniex_orders = [{'price': '0.01670000', 'amount': '1'}, {'price': '0.01680000', 'amount': '2'}]
+        absortium_orders = [{'pk': 1, 'price': '0.0167', 'amount': '1'},
+                            {'pk': 2, 'price': '0.016800000000', 'amount': '1'}]
+
+        avoided = counters['avoided_actions']
+        actions = create_actions(self.orders(absortium_orders), self.orders(poloniex_orders))
+        check_that = self.init_check(actions)
+
+        self.assertEqual(actions['delete'], [])
+        self.assertEqual(actions['create'], [])
+        self.assertEqual(check_that(pk=2, action='update'), True)
+        self.assertEqual(counters['avoided_actions'] - avoided, 3)
+
+    def test_action_canonical_price_fixed_point(self):
+        previous = numeric.arithmetic
+        numeric.set_arithmetic(numeric.FixedPointArithmetic())
+
+        try:
+            self.test_action_canonical_price()
+        finally:
+            numeric.set_arithmetic(previous)
+
+    def test_convert(self):
+        order = convert({'rate': '0.01670000', 'amount': 1e-08, 'type': 'ask', 'pair': 'BTC_ETH'})
+
+        self.assertEqual(order.order_type, 'sell')
+        self.assertEqual(order.pair, 'btc_eth')
+        self.assertEqual(order.price, D('0.0167'))
+        self.assertEqual(order.key, convert({'rate': 0.0167, 'type': 'ask', 'pair': 'BTC_ETH'}).key)
+
+        data = order.to_dict()
+        self.assertEqual(data['price'], '0.01670000')
+        self.assertEqual(data['amount'], '0.00000001')
+        self.assertNotIn('pk', data)
+
+    def test_split_duplicates(self):
+        orders = [Order(pk=1, pair='btc_eth', order_type='sell', price=D('0.1'), amount=D('1')),
+                  Order(pk=2, pair='btc_eth', order_type='sell', price=D('0.10'), amount=D('2')),
+                  Order(pk=3, pair='btc_eth', order_type='buy', price=D('0.1'), amount=D('1')),
+                  Order(pk=4, pair='btc_ltc', order_type='sell', price=D('0.1'), amount=D('1'))]
+
+        unique, duplicates = split_duplicates(orders)
+        self.assertEqual(sorted(order.pk for order in unique), [1, 3, 4])
+        self.assertEqual([order.pk for order in duplicates], [2])
@@ -0,0 +1,91 @@
+import random
+from decimal import Decimal as D
+from unittest import skipIf
+
+from core.utils.logging import getPrettyLogger
+from poloniexbot import numeric
+from poloniexbot.order import Order
+from poloniexbot.orderbook import OrderBookSide
+from poloniexbot.tests.base import PoloniexBotUnitTest
+from poloniexbot.utils import cut_off_orders, cut_off_orders_vectorized, numpy
+
+__author__ = 'andrew.shvv@gmail.com'
+
+logger = getPrettyLogger(__name__)
+
+
+@skipIf(numpy is None, "numpy is not installed")
+class VectorizedCutOffTest(PoloniexBotUnitTest):
+    def generate(self, depth, seed):
+        generator = random.Random(seed)
+
+        orders = []
+        for index in range(depth):
+            # Some of the levels are dust and should be skipped.
+            amount = D(generator.choice([generator.randint(1, 10 ** 4), generator.randint(1, 10 ** 9)])).scaleb(-6)
+            price = D("0.0167") + D(index).scaleb(-8)
+
+            orders.append(Order(price=numeric.from_decimal(price), amount=numeric.from_decimal(amount)))
+
+        return orders
+
+    def check_parity(self, balance, orders):
+        expected = cut_off_orders(balance, orders)
+        result = cut_off_orders_vectorized(balance, orders)
+
+        self.assertEqual([order.price for order in result], [order.price for order in expected])
+        self.assertEqual([order.amount for order in result], [order.amount for order in expected])
+
+    def check_random(self):
+        for seed in range(20):
+            orders = self.generate(depth=500, seed=seed)
+            total = sum([order.amount for order in orders])
+
+            for fraction in ["0", "0.001", "0.3", "0.999", "1", "2"]:
+                self.check_parity(numeric.from_decimal(numeric.to_decimal(total) * D(fraction)), orders)
+
+    def check_book(self):
+        generator = random.Random(0)
+
+        side = OrderBookSide(depth=100)
+        vectorized_side = OrderBookSide(depth=100, vectorized=True)
+
+        for _ in range(2000):
+            price = D("0.0167") + D(generator.randint(0, 300)).scaleb(-8)
+            amount = D(generator.choice([0, generator.randint(1, 10 ** 9)])).scaleb(-6)
+
+            order = Order(price=numeric.from_decimal(price), amount=numeric.from_decimal(amount))
+            side.update(order)
+            vectorized_side.update(order)
+
+            balance = numeric.parse(generator.randint(0, 10 ** 5))
+            expected = side.cut_off(balance)
+            result = vectorized_side.cut_off(balance)
+
+            self.assertEqual([(order.price, order.amount) for order in result],
+                             [(order.price, order.amount) for order in expected])
+
+    def check_all(self):
+        self.check_random()
+        self.check_book()
+
+    def test_parity(self):
+        self.check_all()
+
+    def test_parity_fixed_point(self):
+        previous = numeric.arithmetic
+        numeric.set_arithmetic(numeric.FixedPointArithmetic())
+
+        try:
+            self.check_all()
+        finally:
+            numeric.set_arithmetic(previous)
+
+    def test_exact_balance(self):
+        orders = [Order(price=numeric.parse(price), amount=numeric.parse(amount))
+                  for price, amount in [('1', '1'), ('2', '9'), ('3', '5')]]
+
+        self.check_parity(numeric.parse(10), orders)
+        self.check_parity(numeric.parse(15), orders)
+        self.check_parity(numeric.parse(0), orders)
+        self.check_parity(numeric.parse(10), [])
@@ -1,28 +1,52 @@
-from decimal import Decimal as D
+from collections import Counter
 
-from poloniexbot import constants
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from poloniexbot import constants, numeric
+from poloniexbot.order import Order
 
 __author__ = 'andrew.shvv@gmail.com'
 
+# Number of actions which were not sent because prices matched only by canonical price key
+# (raw price strings differ).
+counters = Counter()
+
 
 def filter_orders(orders):
     return [order for order in orders
-            if order['status'] in ['init', 'pending']]
+            if order.status in ['init', 'pending']]
+
 
+def get_cost(order, by_total=False):
+    """
+        How much of the currency we operate with the order locks: amount for the sell order,
+        total (price * amount, in the quote currency) for the buy one.
+    """
+    return numeric.multiply(order.price, order.amount) if by_total else order.amount
 
-def get_locked_balance(orders):
-    return sum([D(order['amount']) for order in orders
-                if order['status'] in ['init', 'pending']])
+
+def get_locked_balance(orders, by_total=False):
+    return sum([get_cost(order, by_total) for order in orders
+                if order.status in ['init', 'pending']])
 
 
 def create_actions(absortium_orders, poloniex_orders):
-    def update(old_order, new_orders):
-        for k, v in new_orders.items():
-            old_order[k] = v
-        return old_order
+    absortium_orders = {order.key: order for order in absortium_orders}
+    poloniex_orders = {order.key: order for order in poloniex_orders}
+
+    prices = set(absortium_orders.keys()) | set(poloniex_orders.keys())
+    return create_incremental_actions(absortium_orders, poloniex_orders, prices)
 
-    absortium_orders = {order['price']: order for order in absortium_orders}
-    poloniex_orders = {order['price']: order for order in poloniex_orders}
+
+def create_incremental_actions(absortium_orders, poloniex_orders, prices):
+    """
+        Same as `create_actions`, but orders are given as dicts keyed by price key and only
+        the given price keys are checked, so that the cost is proportional to the number of
+        changed levels rather than to the depth of the book.
+    """
 
     actions = {
         'update': [],
@@ -30,103 +54,149 @@ def create_actions(absortium_orders, poloniex_orders):
         'create': []
     }
 
-    absortium_prices = absortium_orders.keys()
-    poloniex_prices = poloniex_orders.keys()
+    for price in prices:
+        absortium_order = absortium_orders.get(price)
+        poloniex_order = poloniex_orders.get(price)
+
+        if absortium_order is None and poloniex_order is None:
+            continue
 
-    # 1. Check that absortium
-    delete_orders = list(set(absortium_prices) - set(poloniex_prices))
-    create_orders = list(set(poloniex_prices) - set(absortium_prices))
-    update_orders = list(set(poloniex_prices) & set(absortium_prices))
+        elif poloniex_order is None:
+            actions['delete'].append(absortium_order)
 
-    for price in delete_orders:
-        actions['delete'].append(absortium_orders[price])
+        elif absortium_order is None:
+            actions['create'].append(poloniex_order)
 
-    for price in create_orders:
-        actions['create'].append(poloniex_orders[price])
+        else:
+            is_updated = absortium_order.amount != poloniex_order.amount
 
-    for price in update_orders:
-        if D(absortium_orders[price]['amount']) != D(poloniex_orders[price]['amount']):
-            actions['update'].append(update(absortium_orders[price], poloniex_orders[price]))
+            if absortium_order.raw_price != poloniex_order.raw_price and \
+                    None not in (absortium_order.raw_price, poloniex_order.raw_price):
+                # Compared as strings it would be delete + create. Parsed prices can not tell it,
+                # in the fixed point mode they are the same ints.
+                counters['avoided_actions'] += 1 if is_updated else 2
+
+            if is_updated:
+                # Absortium orders might be the shadow of our orders, so they should not be changed in place.
+                actions['update'].append(absortium_order.copy(amount=poloniex_order.amount))
 
     return actions
 
 
-def cut_off_orders(balance, orders):
+def split_duplicates(orders):
+    """
+        Returns orders with unique (pair, order type, price) and the rest of them - we keep only
+        one order on every price level, the duplicates should be cancelled.
+    """
+    unique = {}
+    duplicates = []
+
+    for order in orders:
+        key = (order.pair, order.order_type, order.key)
+
+        if key in unique:
+            duplicates.append(order)
+        else:
+            unique[key] = order
+
+    return list(unique.values()), duplicates
+
+
+def cut_off_orders(balance, orders, by_total=False):
+    """
+        Take the orders, best first, while we have the balance for them (see `get_cost`);
+        the last one is truncated to what is left.
+    """
     new_orders = []
 
     for order in orders:
-        amount = D(order['amount'])
+        amount = order.amount
+
+        if amount > numeric.cut_off_min_amount:
+            cost = get_cost(order, by_total)
 
-        if amount > D("0.001"):
-            if balance > amount:
+            if balance > cost:
                 new_orders.append(order)
-                balance -= amount
+                balance -= cost
             else:
-                order['amount'] = str(balance)
-                new_orders.append(order)
+                amount = numeric.divide(balance, order.price) if by_total else balance
+                new_orders.append(order.copy(amount=amount))
                 break
 
     return new_orders
 
 
-def convert(order):
-    price = str(order["rate"])
-    amount = str(order.get("amount", 0))
+def cut_off_orders_vectorized(balance, orders, amounts=None):
+    """
+        Same as `cut_off_orders`, but the cut off level is found with one cumsum/searchsorted
+        over the array of amounts, which pays off for the deep books (hundreds of levels and more),
+        especially if the array is kept along with the levels (see `OrderBookSide`) and is
+        given as `amounts`. If `numpy` is not installed, falls back to `cut_off_orders`.
+    """
+    if numpy is None or not len(orders):
+        return cut_off_orders(balance, orders)
 
-    if order["type"] in ["bid", "bids"]:
-        order_type = "buy"
-    elif order["type"] in ["ask", "asks"]:
-        order_type = "sell"
-    else:
-        raise Exception("Unknown order type")
+    if amounts is None:
+        amounts = numpy.array([order.amount for order in orders], dtype=object)
 
-    return {
-        "pair": order["pair"].lower(),
-        "order_type": order_type,
-        "price": price,
-        "amount": amount,
-        "need_approve": True
-    }
+    # Sum of integer amounts should not overflow, otherwise it is summed as python ints.
+    if amounts.dtype != object and int(amounts.max()) * len(amounts) >= 2 ** 63:
+        amounts = amounts.astype(object)
 
+    indexes = numpy.flatnonzero(amounts > numeric.cut_off_min_amount)
+    cumulative = numpy.cumsum(amounts[indexes])
 
-def update_storage(storage, new_order):
-    def get_index(price, orders):
-        for index, order in enumerate(orders):
-            if D(order['price']) == D(price):
-                return index
+    if balance <= 0:
+        position = 0
+    else:
+        position = int(numpy.searchsorted(cumulative, cumulative.dtype.type(balance), side='left'))
 
-        raise IndexError
+    new_orders = [orders[index] for index in indexes[:position]]
 
-    orders = storage['orders'][new_order['order_type']]
-    is_zero_amount = D(new_order['amount']) == D("0")
+    if position < len(indexes):
+        amount = cumulative[position - 1] if position else 0
 
-    try:
-        index = get_index(new_order['price'], orders)
+        if isinstance(amount, numpy.generic):
+            amount = amount.item()
 
-        if is_zero_amount:
-            del orders[index]
-        else:
-            orders[index] = new_order
+        new_orders.append(orders[indexes[position]].copy(amount=balance - amount))
 
-    except IndexError:
-        if not is_zero_amount:
-            orders.append(new_order)
+    return new_orders
 
-    storage['orders'][new_order['order_type']] = sorted(orders, key=lambda order: D(order['price']))[:20]
 
+def convert(order):
+    price = numeric.parse(order["rate"])
+    amount = numeric.parse(order.get("amount", 0))
 
-def synchronize_orders(storage, orders):
-    def sync(orders, order_book_type):
-        for price, amount in orders[order_book_type]:
-            order = {
-                "rate": price,
-                "amount": amount,
-                "pair": constants.CURRENCY_PAIR,
-                "type": order_book_type
-            }
+    if order["type"] in ["bid", "bids"]:
+        order_type = "buy"
+    elif order["type"] in ["ask", "asks"]:
+        order_type = "sell"
+    else:
+        raise Exception("Unknown order type")
 
-            order = convert(order)
-            update_storage(storage, order)
+    return Order(pair=order["pair"].lower(),
+                 order_type=order_type,
+                 price=price,
+                 amount=amount,
+                 raw_price=str(order["rate"]))
 
-    sync(orders, "bids")
-    sync(orders, "asks")
+
+def update_storage(storage, new_order):
+    return storage.update(new_order)
+
+
+def synchronize_orders(storage, orders, pair=constants.CURRENCY_PAIR):
+    """
+        Replace the book with the snapshot given by `returnOrderBook`. Every side is loaded in
+        one pass (see `OrderBookSide.load`), levels are not inserted one by one.
+    """
+    pair = pair.lower()
+
+    for order_book_type, order_type in [("bids", "buy"), ("asks", "sell")]:
+        storage.load(order_type, [Order(pair=pair,
+                                        order_type=order_type,
+                                        price=numeric.parse(price),
+                                        amount=numeric.parse(amount),
+                                        raw_price=str(price))
+                                  for price, amount in orders[order_book_type]])